@@ -1,17 +1,377 @@
-from flask import Flask, jsonify
+import os
+import gzip
+import hmac
+import json
+import base64
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+
+from flask import Flask, Response, g, request
 import pipeline
+import instrumentation
+import live_updates
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
 
 app = Flask(__name__)
 
+# Encoded /api/data bodies for the current servable snapshot generation
+_encoded_payload = None
+_encoded_payload_lock = threading.Lock()
+
+# /api/data query parameters; any of them switches off the pre-encoded fast path
+QUERY_PARAMS = ('name', 'fields', 'limit', 'cursor', 'since')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Filtered bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Shared secret required by /api/refresh when set (see watcher.py)
+REFRESH_TOKEN = os.environ.get('PDOOM_REFRESH_TOKEN')
+
+# Resident builder, so config, templates and HTTP connections stay cached.
+# Created on first use: importing build_system configures logging and
+# creates the config/data/templates directories
+_builder = None
+_builder_lock = threading.Lock()
+
+# Seconds a rendered /dashboard page is served before data is fetched again
+DASHBOARD_TTL = float(os.environ.get('PDOOM_DASHBOARD_TTL', '300'))
+# (rendered_at, html) of the last /dashboard render
+_dashboard_page = None
+_dashboard_lock = threading.Lock()
+
+# Servable snapshot cache counters, copied from pipeline at scrape time
+SNAPSHOT_HITS = instrumentation.REGISTRY.register(instrumentation.Counter(
+    'pdoom_snapshot_cache_hits_total', 'serve_data calls answered from the cached snapshot.'))
+SNAPSHOT_MISSES = instrumentation.REGISTRY.register(instrumentation.Counter(
+    'pdoom_snapshot_cache_misses_total', 'serve_data calls that rebuilt the snapshot.'))
+SNAPSHOT_GENERATION = instrumentation.REGISTRY.register(instrumentation.Gauge(
+    'pdoom_snapshot_generation', 'Generation of the current servable snapshot.'))
+STREAM_CLIENTS = instrumentation.REGISTRY.register(instrumentation.Gauge(
+    'pdoom_stream_clients', 'Clients connected to /api/stream.'))
+
+@instrumentation.REGISTRY.add_collector
+def _collect_snapshot_stats():
+    stats = pipeline.snapshot_stats()
+    SNAPSHOT_HITS.set_total(stats['hits'])
+    SNAPSHOT_MISSES.set_total(stats['misses'])
+    SNAPSHOT_GENERATION.set(stats['generation'])
+    STREAM_CLIENTS.set(live_updates.broadcaster.client_count)
+
+class EncodedPayload:
+    """Serialized servable payload in every supported content-coding."""
+
+    def __init__(self, generation, bodies, etag, last_modified):
+        self.generation = generation
+        self.bodies = bodies
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def etag_for(self, encoding):
+        """Strong ETag for one representation; each content-coding gets its own."""
+        if encoding == 'identity':
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """Check an If-None-Match header against all representations."""
+        if if_none_match.strip() == '*':
+            return True
+        tags = {self.etag_for(encoding) for encoding in self.bodies}
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate in tags:
+                return True
+        return False
+
+def _encode_snapshot(snapshot):
+    """Serialize a snapshot once and compress it for each supported coding."""
+    identity = app.json.dumps(snapshot.payload).encode('utf-8') + b'\n'
+    bodies = {'identity': identity, 'gzip': gzip.compress(identity, mtime=0)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(identity)
+
+    # HTTP dates have one-second resolution. A published zone uses its publish
+    # time, so a rollback to older files still moves Last-Modified forward
+    if snapshot.published_at is not None:
+        last_modified = snapshot.published_at // 1_000_000_000
+    else:
+        mtimes = [sig[0] // 1_000_000_000 for sig in snapshot.signatures.values() if sig is not None]
+        last_modified = max(mtimes) if mtimes else None
+    etag = hashlib.sha256(identity).hexdigest()[:32]
+    return EncodedPayload(snapshot.generation, bodies, etag, last_modified)
+
+def get_encoded_payload():
+    """Return the encoded payload, re-serializing only when the snapshot changes."""
+    global _encoded_payload
+    snapshot = pipeline.load_servable_snapshot()
+    encoded = _encoded_payload
+    if encoded is not None and encoded.generation == snapshot.generation:
+        return encoded
+
+    with _encoded_payload_lock:
+        encoded = _encoded_payload
+        if encoded is None or encoded.generation != snapshot.generation:
+            encoded = _encode_snapshot(snapshot)
+            _encoded_payload = encoded
+        return encoded
+
+def get_builder():
+    """Return the resident dashboard builder, creating it on first use."""
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            from build_system import PDoomDashboardBuilder
+            _builder = PDoomDashboardBuilder()
+        return _builder
+
+def get_dashboard_page():
+    """Return the rendered dashboard, re-rendering at most once per DASHBOARD_TTL."""
+    global _dashboard_page
+    page = _dashboard_page
+    if page is not None and time.monotonic() - page[0] < DASHBOARD_TTL:
+        return page[1]
+
+    # One render at a time; requests arriving meanwhile wait and reuse it
+    with _dashboard_lock:
+        page = _dashboard_page
+        if page is None or time.monotonic() - page[0] >= DASHBOARD_TTL:
+            html = ''.join(get_builder().generate_dashboard())
+            page = (time.monotonic(), html)
+            _dashboard_page = page
+        return page[1]
+
+def _choose_encoding(encoded):
+    """Pick the best content-coding the client accepts."""
+    for encoding in ('br', 'gzip'):
+        if encoding in encoded.bodies and request.accept_encodings[encoding]:
+            return encoding
+    return 'identity'
+
+class QueryError(ValueError):
+    """Invalid /api/data query parameter."""
+
+def encode_cursor(generation, offset):
+    """Opaque pagination cursor tied to one snapshot generation."""
+    raw = json.dumps({'generation': generation, 'offset': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (generation, offset) from a cursor made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        state = json.loads(raw)
+        generation, offset = state['generation'], state['offset']
+    except (ValueError, KeyError, TypeError):
+        raise QueryError('Invalid cursor')
+    # encode_cursor only writes ints; 1e400 and friends would overflow int()
+    if not all(type(value) is int for value in (generation, offset)):
+        raise QueryError('Invalid cursor')
+    return generation, offset
+
+def _list_param(name):
+    """Values of a repeatable, comma-separated query parameter, or None if absent."""
+    if name not in request.args:
+        return None
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(part.strip() for part in raw.split(',') if part.strip())
+    return values
+
+def query_snapshot(snapshot):
+    """Answer a filtered /api/data request from the snapshot indexes."""
+    names = _list_param('name')
+    fields = _list_param('fields')
+
+    since = request.args.get('since')
+    if since is not None:
+        since = pipeline.parse_timestamp(since)
+        if since is None:
+            raise QueryError("'since' must be an ISO 8601 timestamp or epoch seconds")
+
+    offset = 0
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        generation, offset = decode_cursor(cursor)
+        if offset < 0:
+            raise QueryError('Invalid cursor')
+        if generation != snapshot.generation:
+            raise QueryError('Cursor is from an older snapshot; restart from the first page')
+
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise QueryError("'limit' must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise QueryError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+    elif cursor is not None:
+        limit = DEFAULT_PAGE_SIZE
+
+    positions = snapshot.query(names, since)
+    page = positions[offset:offset + limit] if limit is not None else positions[offset:]
+    metrics = snapshot.payload['metrics']
+    if fields is not None:
+        page_metrics = [{field: metrics[position][field] for field in fields if field in metrics[position]}
+                        for position in page]
+    else:
+        page_metrics = [metrics[position] for position in page]
+
+    result = {
+        'metrics': page_metrics,
+        'source': snapshot.payload['source'],
+        'count': len(page_metrics),
+        'total': len(positions),
+    }
+    if limit is not None:
+        end = offset + len(page_metrics)
+        result['next_cursor'] = encode_cursor(snapshot.generation, end) if end < len(positions) else None
+    return result
+
+def _filtered_response():
+    """Serialize a query slice; only the requested metrics are encoded."""
+    snapshot = pipeline.load_servable_snapshot()
+    try:
+        result = query_snapshot(snapshot)
+    except QueryError as e:
+        return {'error': str(e)}, 400
+
+    body = app.json.dumps(result).encode('utf-8') + b'\n'
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    tags = {'identity': f'"{digest}"', 'gzip': f'"{digest}-gzip"'}
+    encoding = 'identity'
+    if len(body) >= MIN_COMPRESS_BYTES and request.accept_encodings['gzip']:
+        encoding = 'gzip'
+
+    headers = {
+        'ETag': tags[encoding],
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache',
+    }
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if '*' in candidates or candidates & set(tags.values()):
+            return Response(status=304, headers=headers)
+
+    if encoding == 'gzip':
+        body = gzip.compress(body, mtime=0)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype='application/json', headers=headers)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    instrumentation.IN_FLIGHT.inc()
+
+@app.after_request
+def _record_request_metrics(response):
+    # Label by URL rule rather than raw path to keep label cardinality bounded
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    started = g.get('request_started')
+    if started is not None:
+        # Streamed responses are timed up to the first byte
+        instrumentation.REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method)
+    instrumentation.REQUESTS.inc(route, request.method, str(response.status_code))
+    if response.content_length is not None:
+        instrumentation.RESPONSE_SIZE.observe(response.content_length, route)
+    return response
+
+@app.teardown_request
+def _end_request(exc):
+    if 'request_started' in g:
+        instrumentation.IN_FLIGHT.dec()
+
 @app.route('/')
 def index():
     return "pdoom-dashboard backend is running."
 
+@app.route('/dashboard')
+def dashboard():
+    # Data sources are fetched at most once per DASHBOARD_TTL, not per request
+    return Response(get_dashboard_page(), mimetype='text/html')
+
 @app.route('/api/data')
 def get_data():
-    # Use pipeline to fetch, validate, and transform data
-    data = pipeline.serve_data()
-    return jsonify(data)
+    if any(param in request.args for param in QUERY_PARAMS):
+        return _filtered_response()
+
+    # Serve the pre-serialized servable snapshot, honouring conditional requests
+    encoded = get_encoded_payload()
+    encoding = _choose_encoding(encoded)
+
+    headers = {
+        'ETag': encoded.etag_for(encoding),
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache',
+    }
+    if encoded.last_modified is not None:
+        headers['Last-Modified'] = formatdate(encoded.last_modified, usegmt=True)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        not_modified = encoded.matches(if_none_match)
+    else:
+        since = request.if_modified_since
+        not_modified = (since is not None and encoded.last_modified is not None
+                        and since.timestamp() >= encoded.last_modified)
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(encoded.bodies[encoding], mimetype='application/json', headers=headers)
+
+@app.route('/api/metrics/<path:name>')
+def get_metric(name):
+    # O(1) lookup of the winning record for one metric name
+    snapshot = pipeline.load_servable_snapshot()
+    found = snapshot.lookup(name)
+    if found is None:
+        return {'error': f"Unknown metric: {name}"}, 404
+    metric, source_file = found
+    return {
+        'name': name,
+        'metric': metric,
+        'source_file': source_file,
+        'records': len(snapshot.positions_by_name[name]),
+    }
+
+@app.route('/api/refresh', methods=['POST'])
+def refresh():
+    # Called by `run_pipeline.py --watch --notify-url` after each run
+    if REFRESH_TOKEN:
+        if not hmac.compare_digest(request.headers.get('X-Refresh-Token', ''), REFRESH_TOKEN):
+            return {'error': 'Invalid refresh token'}, 403
+        # Only an authenticated caller may force a full rebuild (e.g. after hand edits)
+        pipeline.invalidate_servable_snapshot()
+    # Otherwise this rebuilds only if a new version was published, so the
+    # next reader does not pay for it
+    snapshot = pipeline.load_servable_snapshot()
+    return {'status': 'refreshed', 'generation': snapshot.generation, 'count': snapshot.payload['count']}
+
+@app.route('/api/stream')
+def stream():
+    # Server-Sent Events: changed metrics are pushed whenever the snapshot changes
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(live_updates.broadcaster.stream(last_event_id),
+                    mimetype='text/event-stream', headers=headers)
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text exposition format
+    return Response(instrumentation.REGISTRY.render(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
 
 if __name__ == '__main__':
     app.run(debug=True)
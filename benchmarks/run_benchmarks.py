@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark Runner
+
+Measures throughput, latency percentiles and peak RSS of the serving
+layer (pipeline.serve_data), the pipeline stages (run_pipeline) and the
+dashboard builder on synthetic data at several scales. The
+servable_load_* cases compare snapshot load time and size of the JSON
+documents against each binary servable format.
+
+Every case runs in a fresh process inside its own scratch directory, so
+peak RSS is per case and no cache leaks between cases. Results are
+written as JSON; pass --baseline to compare against an earlier run and
+fail on regressions.
+
+    python benchmarks/run_benchmarks.py --scales small,medium
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/baseline.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic_data
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def timed(func, repeat):
+    """Call func `repeat` times and return the wall-clock duration of each call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def quiet():
+    """Silence the pipeline's progress printing while timing"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def prepare_servable(scale):
+    import run_pipeline
+    synthetic_data.generate_raw_zone('.', scale['files'], scale['metrics_per_file'])
+    with quiet():
+        run_pipeline.run_full_pipeline()
+
+def case_serve_data_cold(scale, repeat):
+    """Full snapshot rebuild: walk, parse and merge the servable zone"""
+    import pipeline
+    prepare_servable(scale)
+
+    def rebuild():
+        pipeline.invalidate_servable_snapshot()
+        pipeline.serve_data()
+
+    with quiet():
+        samples = timed(rebuild, repeat)
+    return samples, scale['files'] * scale['metrics_per_file']
+
+def case_serve_data_warm(scale, repeat):
+    """Steady-state request: freshness check against an unchanged zone"""
+    import pipeline
+    prepare_servable(scale)
+    with quiet():
+        pipeline.serve_data()
+    return timed(pipeline.serve_data, repeat * 100), scale['files'] * scale['metrics_per_file']
+
+def make_format_case(fmt):
+    def case(scale, repeat):
+        import yaml
+        import pipeline
+        import run_pipeline
+        import servable_format
+        if fmt not in servable_format.available_formats():
+            raise RuntimeError(f"{fmt} format is not available (package not installed)")
+        os.makedirs('config', exist_ok=True)
+        with open(run_pipeline.ZONE_CONFIG_PATH, 'w') as f:
+            yaml.safe_dump({'servable': {'binary_format': fmt}}, f)
+        prepare_servable(scale)
+
+        zone_root = os.path.realpath(pipeline.SERVABLE_CURRENT_LINK)
+        if fmt == 'none':
+            size = sum(os.path.getsize(path) for path, _ in run_pipeline.iter_json_files(zone_root))
+        else:
+            size = os.path.getsize(os.path.join(zone_root, servable_format.ARTIFACT_NAMES[fmt]))
+
+        def rebuild():
+            pipeline.invalidate_servable_snapshot()
+            pipeline.serve_data()
+
+        with quiet():
+            samples = timed(rebuild, repeat)
+        return samples, scale['files'] * scale['metrics_per_file'], {'format': fmt, 'bytes': size}
+    label = 'JSON documents only' if fmt == 'none' else f"the {fmt} binary copy"
+    case.__doc__ = f"Full snapshot rebuild from {label}; also reports the bytes read"
+    return case
+
+def make_stage_case(stage_name):
+    def case(scale, repeat):
+        import run_pipeline
+        synthetic_data.generate_raw_zone('.', scale['files'], scale['metrics_per_file'])
+        # Earlier stages must have produced this stage's inputs
+        order = ['curate', 'transform', 'serve']
+        stages = {
+            'curate': run_pipeline.curate_data,
+            'transform': run_pipeline.transform_data,
+            'serve': run_pipeline.serve_data_stage,
+        }
+        with quiet():
+            for name in order[:order.index(stage_name)]:
+                stages[name]()
+            samples = timed(lambda: stages[stage_name](force=True), repeat)
+        return samples, scale['files']
+    case.__doc__ = f"Full (--force) {stage_name} stage over every file"
+    return case
+
+def case_pipeline_noop(scale, repeat):
+    """Incremental full pipeline run when no raw file changed"""
+    import run_pipeline
+    synthetic_data.generate_raw_zone('.', scale['files'], scale['metrics_per_file'])
+    with quiet():
+        run_pipeline.run_full_pipeline()
+        samples = timed(run_pipeline.run_full_pipeline, repeat)
+    return samples, scale['files']
+
+def case_builder_build(scale, repeat):
+    """Forced dashboard build with every tile backed by a local data file"""
+    import logging
+    import build_system
+    logging.disable(logging.INFO)
+    synthetic_data.generate_builder_inputs('.', scale['tiles'])
+    builder = build_system.PDoomDashboardBuilder()
+    builder.load_config()  # creates the default config outside the timed region
+    return timed(lambda: builder.build_dashboard(force=True), repeat), scale['tiles']
+
+CASES = {
+    'serve_data_cold': case_serve_data_cold,
+    'serve_data_warm': case_serve_data_warm,
+    'pipeline_curate': make_stage_case('curate'),
+    'pipeline_transform': make_stage_case('transform'),
+    'pipeline_serve': make_stage_case('serve'),
+    'pipeline_noop': case_pipeline_noop,
+    'builder_build': case_builder_build,
+    'servable_load_json': make_format_case('none'),
+    'servable_load_columnar': make_format_case('columnar'),
+    'servable_load_msgpack': make_format_case('msgpack'),
+}
+
+def _case_worker(case_name, scale, repeat, workdir, queue):
+    """Child-process entry point: run one case inside workdir and report"""
+    os.chdir(workdir)
+    try:
+        # Cases may return a third item with extra fields for the result
+        samples, items, *extra = CASES[case_name](scale, repeat)
+        total = sum(samples)
+        result = {
+            'iterations': len(samples),
+            'items': items,
+            'throughput_per_s': items * len(samples) / total if total else None,
+            'mean_s': total / len(samples),
+            'p50_s': percentile(samples, 0.50),
+            'p95_s': percentile(samples, 0.95),
+            'p99_s': percentile(samples, 0.99),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+        if extra:
+            result.update(extra[0])
+        queue.put(result)
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+def run_case(case_name, scale, repeat):
+    workdir = tempfile.mkdtemp(prefix=f"pdoom-bench-{case_name}-")
+    try:
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(target=_case_worker, args=(case_name, scale, repeat, workdir, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(results, baseline, threshold):
+    """Return a list of regressions in p50 latency beyond `threshold` (a fraction)"""
+    regressions = []
+    for case_name, scales in results['results'].items():
+        for scale_name, result in scales.items():
+            previous = baseline.get('results', {}).get(case_name, {}).get(scale_name)
+            if not previous or 'p50_s' not in previous or 'p50_s' not in result:
+                continue
+            change = result['p50_s'] / previous['p50_s'] - 1 if previous['p50_s'] else 0.0
+            if change > threshold:
+                regressions.append(f"{case_name}[{scale_name}]: p50 {previous['p50_s']:.6f}s -> "
+                                   f"{result['p50_s']:.6f}s (+{change:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run pdoom-dashboard benchmarks')
+    parser.add_argument('--scales', default='small',
+                        help=f"Comma-separated scales ({', '.join(synthetic_data.SCALES)})")
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help='Comma-separated cases to run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed iterations per case')
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'),
+                        help='Where to write the results JSON')
+    parser.add_argument('--baseline', help='Results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Allowed p50 slowdown versus the baseline (0.20 = 20%%)')
+
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'scales': {},
+        'results': {}
+    }
+
+    for scale_name in args.scales.split(','):
+        scale = synthetic_data.SCALES[scale_name]
+        results['scales'][scale_name] = scale
+        for case_name in args.cases.split(','):
+            print(f"=== {case_name} [{scale_name}] ===")
+            result = run_case(case_name, scale, args.repeat)
+            results['results'].setdefault(case_name, {})[scale_name] = result
+            if 'error' in result:
+                print(f"  ✗ {result['error']}")
+            else:
+                print(f"  p50 {result['p50_s'] * 1000:.3f} ms | p99 {result['p99_s'] * 1000:.3f} ms | "
+                      f"{result['throughput_per_s']:.0f} items/s | peak RSS {result['peak_rss_kb']} KiB"
+                      + (f" | {result['bytes']} bytes" if 'bytes' in result else ''))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"  ✗ REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator
+
+Writes raw-zone metric files and builder metric configs at arbitrary
+scale, so the pipeline, serving layer and dashboard builder can be
+benchmarked well beyond the six metrics in data/raw/toy_data.json.
+"""
+
+import os
+import json
+import random
+import argparse
+import yaml
+
+# Named scales used by run_benchmarks.py: raw files, metrics per file, dashboard tiles
+SCALES = {
+    'small': {'files': 100, 'metrics_per_file': 10, 'tiles': 50},
+    'medium': {'files': 1000, 'metrics_per_file': 100, 'tiles': 500},
+    'large': {'files': 10000, 'metrics_per_file': 100, 'tiles': 5000},
+}
+
+def make_document(file_index, metrics_per_file, rng):
+    """One raw-zone document in the format expected by the pipeline"""
+    return {
+        'metrics': [
+            {'name': f"metric_{file_index}_{index}", 'value': rng.randint(0, 20000)}
+            for index in range(metrics_per_file)
+        ],
+        'source': 'synthetic'
+    }
+
+def generate_raw_zone(root, files, metrics_per_file, seed=0, files_per_dir=500):
+    """Write `files` raw JSON documents under root/data/raw, spread over subfolders"""
+    rng = random.Random(seed)
+    raw_dir = os.path.join(root, 'data', 'raw')
+    for file_index in range(files):
+        folder = os.path.join(raw_dir, f"batch_{file_index // files_per_dir:04d}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"metrics_{file_index:06d}.json"), 'w') as f:
+            json.dump(make_document(file_index, metrics_per_file, rng), f, indent=2)
+    return raw_dir
+
+def generate_builder_inputs(root, tiles, seed=0):
+    """Write a metrics.yaml with `tiles` local data sources plus their data files"""
+    rng = random.Random(seed)
+    config_dir = os.path.join(root, 'config')
+    source_dir = os.path.join(root, 'data', 'bench_sources')
+    os.makedirs(config_dir, exist_ok=True)
+    os.makedirs(source_dir, exist_ok=True)
+
+    metrics = []
+    for index in range(tiles):
+        metric_id = f"metric_{index}"
+        with open(os.path.join(source_dir, f"{metric_id}.json"), 'w') as f:
+            json.dump({
+                'current_value': rng.randint(0, 20000),
+                'trend': f"+{rng.randint(0, 100)}",
+                'trend_period': '30d',
+                'confidence': 'medium'
+            }, f)
+        metrics.append({
+            'id': metric_id,
+            'title': f"Metric {index}",
+            'description': 'Synthetic benchmark metric',
+            'data_source': f"local:bench_sources/{metric_id}.json",
+            'placeholder': False,
+            'color_scheme': 'neutral',
+            'format': 'integer'
+        })
+
+    with open(os.path.join(config_dir, 'metrics.yaml'), 'w') as f:
+        yaml.safe_dump(metrics, f)
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic pipeline and builder data')
+    parser.add_argument('root', help='Directory to populate (data/ and config/ are created inside)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    scale = SCALES[args.scale]
+
+    generate_raw_zone(args.root, scale['files'], scale['metrics_per_file'], args.seed)
+    generate_builder_inputs(args.root, scale['tiles'], args.seed)
+    print(f"Generated {args.scale} dataset in {args.root}: {scale}")
+
+if __name__ == '__main__':
+    main()
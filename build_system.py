@@ -4,20 +4,291 @@ P(Doom) Dashboard Build System
 Generates static dashboard from configurable metrics and data sources
 """
 
+import copy
+import cProfile
+import hashlib
 import json
 import os
+import queue
+import threading
+import time
 import requests
 import yaml
+from concurrent.futures import Future, wait
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, fields
 from datetime import datetime
 from pathlib import Path
-from jinja2 import Template
-from typing import Dict, List, Any, Optional
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from markupsafe import Markup
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 import logging
 
+import history_store
+
+try:
+    # LibYAML's C parser is several times faster when PyYAML was built with it
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class BuildSettings:
+    """Tunables from the optional 'build' section of dashboard_config.yaml"""
+    fetch_workers: int = 8          # concurrent data source fetches
+    fetch_deadline: float = 30.0    # seconds the whole fetch phase may take
+    request_timeout: float = 10.0   # seconds per HTTP request
+    pool_size: int = 10             # keep-alive connections kept per host
+    per_host_limit: int = 4         # concurrent requests allowed to one host
+    max_retries: int = 3            # retries on connection errors, timeouts and 5xx
+    backoff_factor: float = 0.5     # exponential backoff base in seconds
+    backoff_jitter: float = 0.25    # random jitter added to each backoff, in seconds
+    http_cache: bool = True         # revalidate remote sources with ETag/Last-Modified
+    stale_if_error: Optional[float] = 86400  # max age in seconds of a cached copy used when a fetch fails (null = any age)
+    
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'BuildSettings':
+        known = {field.name for field in fields(cls)}
+        for key in set(values) - known:
+            logger.warning(f"Ignoring unknown build setting: {key}")
+        return cls(**{key: value for key, value in values.items() if key in known})
+
+@dataclass(frozen=True)
+class DashboardSettings:
+    """Typed, read-only view of dashboard_config.yaml"""
+    title: str
+    subtitle: str
+    update_frequency: str
+    github_repo: str
+    pdoom_data_repo: str
+    local_data: str
+    build: BuildSettings
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'DashboardSettings':
+        dashboard = config.get('dashboard') or {}
+        sources = dashboard.get('data_sources') or {}
+        return cls(
+            title=dashboard.get('title', ''),
+            subtitle=dashboard.get('subtitle', ''),
+            update_frequency=dashboard.get('update_frequency', ''),
+            github_repo=dashboard.get('github_repo', ''),
+            pdoom_data_repo=sources.get('pdoom_data_repo', ''),
+            local_data=sources.get('local_data', ''),
+            build=BuildSettings.from_dict(config.get('build') or {})
+        )
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+BUILD_FINGERPRINT_FILE = "build_fingerprint.json"
+BUILD_PROFILE_FILE = "build_profile.json"
+TILE_TEMPLATE = "metric_tile.html"
+
+# Fields regenerated on every build that must not affect the fingerprint
+VOLATILE_SAMPLE_FIELDS = ('last_updated',)
+
+# Units accepted in period strings such as trend_period: '30d'
+PERIOD_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def parse_period(period: str) -> float:
+    """Convert a period like '30s', '12h' or '30d' to seconds"""
+    period = str(period).strip()
+    if period and period[-1] in PERIOD_UNITS:
+        return float(period[:-1]) * PERIOD_UNITS[period[-1]]
+    return float(period)
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def hash_payload(payload: Any, exclude: Tuple[str, ...] = ()) -> str:
+    """Stable hash of a JSON-serializable payload, ignoring top-level keys in `exclude`"""
+    if isinstance(payload, dict) and exclude:
+        payload = {key: value for key, value in payload.items() if key not in exclude}
+    return hash_bytes(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'))
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Atomically replace a file, unless it already holds exactly this content"""
+    return write_stream_if_changed(path, [content])
+
+def file_digest(path: Path) -> Optional[str]:
+    """SHA-256 of a file read in blocks, or None if it cannot be read"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def write_stream_if_changed(path: Path, chunks: Iterable[str]) -> bool:
+    """Stream text chunks into a temp file and atomically rename it over path
+    
+    The temp file is discarded if the result is identical to the existing
+    file, so unchanged outputs keep their mtime.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                digest.update(data)
+                f.write(data)
+        if file_digest(path) == digest.hexdigest():
+            tmp_path.unlink()
+            return False
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+# Jinja environments shared by every builder in the process, keyed by
+# (templates dir, bytecode cache dir), so compiled templates are reused
+_template_environments: Dict[Tuple[str, str], Environment] = {}
+_template_environments_lock = threading.Lock()
+
+def get_template_environment(templates_dir: Path, cache_dir: Path) -> Environment:
+    """Return the shared Jinja environment for a templates directory
+    
+    Templates are recompiled only when their mtime changes, and compiled
+    bytecode is cached on disk so new processes skip compilation too.
+    """
+    key = (str(templates_dir.resolve()), str(cache_dir.resolve()))
+    with _template_environments_lock:
+        env = _template_environments.get(key)
+        if env is None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            env = Environment(
+                loader=FileSystemLoader(key[0]),
+                auto_reload=True,
+                autoescape=select_autoescape(['html', 'xml']),
+                bytecode_cache=FileSystemBytecodeCache(key[1])
+            )
+            _template_environments[key] = env
+        return env
+
+def cache_validator(meta: Dict[str, Any]) -> Optional[str]:
+    """ETag (or failing that Last-Modified) identifying a cached HTTP body"""
+    if meta.get('etag'):
+        return f"etag:{meta['etag']}"
+    if meta.get('last_modified'):
+        return f"last-modified:{meta['last_modified']}"
+    return None
+
+def make_retry(settings: BuildSettings) -> Retry:
+    """Build the urllib3 retry policy for builder fetches"""
+    options = dict(
+        total=int(settings.max_retries),
+        backoff_factor=float(settings.backoff_factor),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=float(settings.backoff_jitter), **options)
+    except TypeError:
+        # urllib3 < 2.0 has no backoff_jitter
+        return Retry(**options)
+
+def run_on_daemon_threads(func, items, workers: int, name: str = 'worker') -> List[Future]:
+    """Call func(item) for every item on `workers` daemon threads; returns one Future per item
+    
+    ThreadPoolExecutor workers are joined at interpreter exit, so a hung
+    call would hold the process open. Daemon threads do not: calls still
+    running when the caller stops waiting are abandoned, and queued calls
+    whose futures were cancelled never start.
+    """
+    work = queue.SimpleQueue()
+    futures = []
+    for item in items:
+        future = Future()
+        futures.append(future)
+        work.put((item, future))
+    
+    def worker():
+        while True:
+            try:
+                item, future = work.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(item))
+            except BaseException as e:
+                future.set_exception(e)
+    
+    for index in range(max(1, workers)):
+        threading.Thread(target=worker, name=f"{name}_{index}", daemon=True).start()
+    return futures
+
+class BuildProfile:
+    """Wall-clock and CPU timings of a build, per phase and per metric"""
+    
+    def __init__(self):
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time a build phase; repeated phases accumulate"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                totals = self.phases.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0})
+                totals['wall_s'] += time.perf_counter() - wall
+                totals['cpu_s'] += time.process_time() - cpu
+                totals['calls'] += 1
+    
+    @contextmanager
+    def metric(self, metric_id: str):
+        """Time one metric's fetch on the current thread"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        self._local.metric_id = metric_id
+        try:
+            yield
+        finally:
+            self._local.metric_id = None
+            with self._lock:
+                entry = self.metrics.setdefault(metric_id, {'bytes_fetched': 0})
+                entry['fetch_wall_s'] = time.perf_counter() - wall
+                entry['fetch_cpu_s'] = time.thread_time() - cpu
+    
+    def add_bytes(self, count: int):
+        """Attribute fetched bytes to the metric being fetched on this thread"""
+        metric_id = getattr(self._local, 'metric_id', None)
+        with self._lock:
+            entry = self.metrics.setdefault(metric_id or '_unattributed', {'bytes_fetched': 0})
+            entry['bytes_fetched'] += count
+    
+    def set_source(self, metric_id: str, source: str):
+        with self._lock:
+            self.metrics.setdefault(metric_id, {'bytes_fetched': 0})['source'] = source
+    
+    def report(self) -> Dict[str, Any]:
+        return {
+            'build_time': datetime.now().isoformat(),
+            'total_wall_s': time.perf_counter() - self._started,
+            'bytes_fetched': sum(entry['bytes_fetched'] for entry in self.metrics.values()),
+            'phases': self.phases,
+            'metrics': self.metrics
+        }
+
 class PDoomDashboardBuilder:
     def __init__(self, config_dir: str = "config", data_dir: str = "data", 
                  templates_dir: str = "templates", output_dir: str = "."):
@@ -29,6 +300,44 @@ class PDoomDashboardBuilder:
         # Ensure directories exist
         for dir_path in [self.config_dir, self.data_dir, self.templates_dir]:
             dir_path.mkdir(exist_ok=True)
+        
+        # Parsed YAML keyed by path, with the (mtime_ns, size) it was parsed at
+        self._yaml_cache: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+        self._settings_cache: Optional[Tuple[Tuple[int, int], DashboardSettings]] = None
+        self._config_lock = threading.Lock()
+        
+        # Rendered metric tiles keyed by fragment hash; app.py renders from
+        # several request threads, so pruning holds the lock
+        self._fragment_cache: Dict[str, str] = {}
+        self._fragment_lock = threading.Lock()
+        
+        # Set to a BuildProfile to record timings
+        self.profile: Optional[BuildProfile] = None
+        
+        # Shared HTTP session, created on first fetch
+        self._session: Optional[requests.Session] = None
+        self._session_settings = BuildSettings()
+        self._session_lock = threading.Lock()
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        
+        # Parsed JSON of cached HTTP bodies: url -> (validator, payload)
+        self._parsed_cache: Dict[str, Tuple[str, Any]] = {}
+    
+    def _phase(self, name: str):
+        """Profiling context for a build phase; a no-op unless profiling"""
+        return self.profile.phase(name) if self.profile else nullcontext()
+    
+    def _parse_yaml(self, path: Path) -> Tuple[Tuple[int, int], Any]:
+        """Parse a YAML file once, re-parsing only when its mtime or size changes"""
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._config_lock:
+            cached = self._yaml_cache.get(path)
+            if cached is None or cached[0] != signature:
+                with open(path, 'r') as f:
+                    cached = (signature, yaml.load(f, Loader=YamlLoader))
+                self._yaml_cache[path] = cached
+            return cached
     
     def load_config(self) -> Dict[str, Any]:
         """Load main configuration"""
@@ -36,8 +345,20 @@ class PDoomDashboardBuilder:
         if not config_file.exists():
             return self.create_default_config()
         
-        with open(config_file, 'r') as f:
-            return yaml.safe_load(f)
+        # Callers get their own copy so the cached parse stays pristine
+        return copy.deepcopy(self._parse_yaml(config_file)[1])
+    
+    def load_settings(self) -> DashboardSettings:
+        """Typed, frozen view of the main configuration"""
+        config_file = self.config_dir / "dashboard_config.yaml"
+        if not config_file.exists():
+            self.create_default_config()
+        
+        signature, config = self._parse_yaml(config_file)
+        with self._config_lock:
+            if self._settings_cache is None or self._settings_cache[0] != signature:
+                self._settings_cache = (signature, DashboardSettings.from_config(config))
+            return self._settings_cache[1]
     
     def create_default_config(self) -> Dict[str, Any]:
         """Create default configuration file"""
@@ -56,7 +377,8 @@ class PDoomDashboardBuilder:
                 'method': 'github',  # 'github' or 'webform'
                 'github_repo': 'PipFoweraker/pdoom-dashboard',
                 'webform_endpoint': '/api/suggestions'
-            }
+            },
+            'build': asdict(BuildSettings())
         }
         
         config_file = self.config_dir / "dashboard_config.yaml"
@@ -72,8 +394,7 @@ class PDoomDashboardBuilder:
         if not metrics_file.exists():
             return self.create_default_metrics()
         
-        with open(metrics_file, 'r') as f:
-            return yaml.safe_load(f)
+        return copy.deepcopy(self._parse_yaml(metrics_file)[1])
     
     def create_default_metrics(self) -> List[Dict[str, Any]]:
         """Create default metrics configuration"""
@@ -170,16 +491,161 @@ class PDoomDashboardBuilder:
             logger.error(f"Unknown source type: {source_type}")
             return None
     
+    def get_session(self) -> requests.Session:
+        """Return the shared connection-pooled session, creating it on first use"""
+        with self._session_lock:
+            if self._session is None:
+                settings = self.load_settings().build
+                adapter = HTTPAdapter(pool_connections=int(settings.pool_size),
+                                      pool_maxsize=int(settings.pool_size),
+                                      max_retries=make_retry(settings))
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._session_settings = settings
+            return self._session
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+    
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        """Semaphore capping concurrent requests to one host"""
+        host = urlsplit(url).netloc
+        with self._session_lock:
+            if host not in self._host_limits:
+                limit = int(self._session_settings.per_host_limit)
+                self._host_limits[host] = threading.BoundedSemaphore(max(1, limit))
+            return self._host_limits[host]
+    
+    def http_get(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET a URL through the shared session, with retries and per-host limits"""
+        session = self.get_session()
+        with self._host_limit(url):
+            response = session.get(url, headers=headers,
+                                   timeout=float(self._session_settings.request_timeout))
+        if self.profile:
+            self.profile.add_bytes(len(response.content))
+        response.raise_for_status()
+        return response
+    
+    def _http_cache_paths(self, url: str):
+        """Metadata and body paths of the cache entry for a URL"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        cache_dir = self.data_dir / 'cache' / 'http'
+        return cache_dir / f"{key}.json", cache_dir / f"{key}.body"
+    
+    def _load_http_cache(self, url: str) -> Optional[Dict[str, Any]]:
+        """Load cached validators for a URL, if a complete entry exists"""
+        meta_file, body_file = self._http_cache_paths(url)
+        if not (meta_file.exists() and body_file.exists()):
+            return None
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('url') == url else None
+    
+    def _store_http_cache(self, url: str, meta: Dict[str, Any], body: Optional[bytes] = None):
+        """Write a cache entry; body first so metadata never points at a missing body"""
+        meta_file, body_file = self._http_cache_paths(url)
+        meta_file.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        if body is not None:
+            tmp_body = body_file.with_name(body_file.name + suffix)
+            tmp_body.write_bytes(body)
+            os.replace(tmp_body, body_file)
+        tmp_meta = meta_file.with_name(meta_file.name + suffix)
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_meta, meta_file)
+    
+    def fetch_bytes(self, url: str) -> bytes:
+        """GET a URL, revalidating against the on-disk cache
+        
+        Sends If-None-Match/If-Modified-Since when a cached copy exists and
+        reuses the cached body on 304. If the request fails, a cached copy no
+        older than 'stale_if_error' seconds is returned instead.
+        """
+        _, body = self._fetch_validated(url)
+        if body is None:
+            body = self._http_cache_paths(url)[1].read_bytes()
+        return body
+    
+    def fetch_json(self, url: str) -> Any:
+        """GET a URL as JSON, reusing the parsed payload while its validator is unchanged
+        
+        The returned payload may be shared between builds; do not modify it.
+        """
+        validator, body = self._fetch_validated(url)
+        if validator is None:
+            return json.loads(body)
+        
+        parsed = self._parsed_cache.get(url)
+        if parsed is not None and parsed[0] == validator:
+            return parsed[1]
+        if body is None:
+            body = self._http_cache_paths(url)[1].read_bytes()
+        payload = json.loads(body)
+        self._parsed_cache[url] = (validator, payload)
+        return payload
+    
+    def _fetch_validated(self, url: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Revalidate a URL; returns (validator of the body, body)
+        
+        The body is None when the cached copy is still current, and the
+        validator None when the response cannot be revalidated.
+        """
+        self.get_session()
+        settings = self._session_settings
+        if not settings.http_cache:
+            return None, self.http_get(url).content
+        
+        cached = self._load_http_cache(url)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        try:
+            response = self.http_get(url, headers)
+        except requests.RequestException as e:
+            max_stale = settings.stale_if_error
+            if cached and (max_stale is None or time.time() - cached['validated_at'] <= float(max_stale)):
+                logger.warning(f"Using cached copy of {url} after fetch error: {e}")
+                return cache_validator(cached), None
+            raise
+        
+        now = time.time()
+        if response.status_code == 304 and cached:
+            cached['validated_at'] = now
+            self._store_http_cache(url, cached)
+            return cache_validator(cached), None
+        
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'validated_at': now
+        }
+        validator = cache_validator(meta)
+        if validator is not None:
+            self._store_http_cache(url, meta, response.content)
+        return validator, response.content
+    
     def fetch_from_pdoom_data(self, path: str) -> Optional[Dict[str, Any]]:
         """Fetch data from pdoom-data repository"""
-        config = self.load_config()
-        base_url = config['dashboard']['data_sources']['pdoom_data_repo']
+        base_url = self.load_settings().pdoom_data_repo
         url = f"{base_url}/dashboard_exports/{path}"
         
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return self.fetch_json(url)
         except requests.RequestException as e:
             logger.warning(f"Failed to fetch {url}: {e}")
             return None
@@ -204,12 +670,57 @@ class PDoomDashboardBuilder:
     def fetch_from_url(self, url: str) -> Optional[Dict[str, Any]]:
         """Fetch data from arbitrary URL"""
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return self.fetch_json(url)
         except requests.RequestException as e:
             logger.warning(f"Failed to fetch {url}: {e}")
             return None
+        except json.JSONDecodeError as e:
+            logger.warning(f"Invalid JSON from {url}: {e}")
+            return None
+    
+    def fetch_all_metrics(self, metrics: List[Dict[str, Any]],
+                          settings: BuildSettings) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Fetch every non-placeholder metric concurrently within the build deadline
+        
+        Returns a dict of metric id to fetched data (None if the fetch failed
+        or did not finish before the deadline).
+        """
+        to_fetch = [metric for metric in metrics if not metric.get('placeholder', True)]
+        if not to_fetch:
+            return {}
+        
+        results = {}
+        deadline = time.monotonic() + float(settings.fetch_deadline)
+        workers = min(int(settings.fetch_workers), len(to_fetch))
+        # Daemon threads, so stragglers delay neither the build nor process exit
+        futures = dict(zip(run_on_daemon_threads(self._fetch_metric, to_fetch, workers, 'fetch'),
+                           (metric['id'] for metric in to_fetch)))
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        
+        for future in done:
+            metric_id = futures[future]
+            try:
+                results[metric_id] = future.result()
+            except Exception as e:
+                logger.warning(f"Fetch for {metric_id} failed: {e}")
+                results[metric_id] = None
+        
+        for future, metric_id in futures.items():
+            if future in not_done:
+                # Fetches that have not started yet are dropped
+                future.cancel()
+                logger.warning(f"Fetch for {metric_id} missed the "
+                               f"{settings.fetch_deadline}s build deadline")
+                results[metric_id] = None
+        
+        return results
+    
+    def _fetch_metric(self, metric: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fetch one metric's data source, timing it when profiling"""
+        if not self.profile:
+            return self.fetch_data_source(metric['data_source'])
+        with self.profile.metric(metric['id']):
+            return self.fetch_data_source(metric['data_source'])
     
     def create_sample_data(self, metric_id: str) -> Dict[str, Any]:
         """Create sample data for placeholder metrics"""
@@ -243,22 +754,38 @@ class PDoomDashboardBuilder:
             }
         }
         
-        return samples.get(metric_id, {
+        sample = samples.get(metric_id, {
             'current_value': 0,
             'trend': '±0',
             'trend_period': '30d',
             'last_updated': datetime.now().isoformat(),
             'confidence': 'unknown'
         })
+        return self.apply_history(metric_id, sample)
+    
+    def apply_history(self, metric_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace sample values and trend with recorded pipeline history, if any"""
+        history_dir = self.data_dir / 'metadata' / 'history'
+        times, values = history_store.load_series(metric_id, history_dir)
+        if not values:
+            return data
+        
+        data['current_value'] = int(values[-1]) if values[-1].is_integer() else values[-1]
+        change = history_store.trend(metric_id, parse_period(data.get('trend_period', '30d')), history_dir)
+        if change is not None:
+            data['trend'] = f"{change:+g}" if change else '±0'
+        data['history_points'] = len(values)
+        return data
     
     def load_template(self, template_name: str) -> Template:
-        """Load Jinja2 template"""
+        """Load Jinja2 template through the shared, cached environment"""
         template_path = self.templates_dir / template_name
         if not template_path.exists():
             self.create_default_template()
         
-        with open(template_path, 'r') as f:
-            return Template(f.read())
+        with self._phase('template_compile'):
+            env = get_template_environment(self.templates_dir, self.data_dir / 'cache' / 'jinja')
+            return env.get_template(template_name)
     
     def create_default_template(self):
         """Create default dashboard template"""
@@ -281,18 +808,8 @@ class PDoomDashboardBuilder:
             <div class="header-status">LIVE | {{ timestamp }} | STATUS: MONITORING</div>
         </div>
         
-        {% for metric in metrics %}
-        <div class="metric-box" data-metric="{{ metric.id }}">
-            {% if metric.placeholder %}
-            <div class="placeholder-overlay"></div>
-            <div class="placeholder-badge">PLACEHOLDER</div>
-            <button class="suggest-data-btn" onclick="openSuggestionModal('{{ metric.id }}')">SUGGEST DATA</button>
-            {% endif %}
-            
-            <div class="metric-header">{{ metric.title }}</div>
-            <div class="metric-value {{ metric.color_scheme }}">{{ metric.data.current_value }}</div>
-            <div class="metric-trend">{{ metric.data.trend }} {{ metric.data.trend_period }}</div>
-        </div>
+        {% for tile in tiles %}
+        {{ tile }}
         {% endfor %}
     </div>
     
@@ -307,50 +824,218 @@ class PDoomDashboardBuilder:
             f.write(template_content)
         
         logger.info(f"Created default template at {template_path}")
+        self.create_default_tile_template()
     
-    def build_dashboard(self):
-        """Main build function"""
-        logger.info("Building P(Doom) dashboard...")
+    def create_default_tile_template(self):
+        """Create default per-metric tile template"""
+        template_content = """{# Cached per metric: may only depend on `metric`, not on build-wide values #}
+<div class="metric-box" data-metric="{{ metric.id }}">
+    {% if metric.placeholder %}
+    <div class="placeholder-overlay"></div>
+    <div class="placeholder-badge">PLACEHOLDER</div>
+    <button class="suggest-data-btn" onclick="openSuggestionModal('{{ metric.id }}')">SUGGEST DATA</button>
+    {% endif %}
+    
+    <div class="metric-header">{{ metric.title }}</div>
+    <div class="metric-value {{ metric.color_scheme }}">{{ metric.data.current_value }}</div>
+    <div class="metric-trend">{{ metric.data.trend }} {{ metric.data.trend_period }}</div>
+</div>
+"""
+        
+        template_path = self.templates_dir / TILE_TEMPLATE
+        with open(template_path, 'w') as f:
+            f.write(template_content)
         
+        logger.info(f"Created default tile template at {template_path}")
+    
+    def render_metric_tiles(self, metrics: List[Dict[str, Any]],
+                            data_hashes: Dict[str, str], prune: bool = False) -> List[Markup]:
+        """Render each metric tile, reusing cached fragments whose inputs are unchanged
+        
+        Fragments are keyed by the hash of the metric's config, its data and
+        the tile template, and kept in memory and under data/cache/fragments/.
+        With `prune`, fragments no current tile refers to are dropped.
+        """
+        tile_path = self.templates_dir / TILE_TEMPLATE
+        if not tile_path.exists():
+            self.create_default_tile_template()
+        template = self.load_template(TILE_TEMPLATE)
+        template_hash = hash_bytes(tile_path.read_bytes())
+        
+        with self._phase('render_tiles'):
+            return self._render_metric_tiles(template, template_hash, metrics, data_hashes, prune)
+    
+    def _render_metric_tiles(self, template: Template, template_hash: str,
+                             metrics: List[Dict[str, Any]], data_hashes: Dict[str, str],
+                             prune: bool) -> List[Markup]:
+        cache_dir = self.data_dir / 'cache' / 'fragments'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        tiles = []
+        used = set()
+        rendered = 0
+        for metric in metrics:
+            config_hash = hash_payload(metric, exclude=('data',))
+            key = hash_payload([config_hash, data_hashes[metric['id']], template_hash])
+            fragment_file = cache_dir / f"{key}.html"
+            
+            html = self._fragment_cache.get(key)
+            if html is None:
+                try:
+                    html = fragment_file.read_text()
+                except OSError:
+                    html = template.render(metric=metric)
+                    write_if_changed(fragment_file, html)
+                    rendered += 1
+                self._fragment_cache[key] = html
+            
+            used.add(fragment_file.name)
+            tiles.append(Markup(html))
+        
+        if prune:
+            self._prune_fragments(cache_dir, used)
+        
+        logger.info(f"Rendered {rendered} of {len(metrics)} metric tiles; the rest came from cache")
+        return tiles
+    
+    def _prune_fragments(self, cache_dir: Path, used: set):
+        """Drop fragments no current tile refers to, on disk and in memory"""
+        with self._fragment_lock:
+            for fragment_file in cache_dir.glob('*.html'):
+                if fragment_file.name not in used:
+                    # Another process may have pruned it already
+                    fragment_file.unlink(missing_ok=True)
+            # list() snapshots the keys in one step, so concurrent inserts are safe
+            for key in list(self._fragment_cache):
+                if f"{key}.html" not in used:
+                    self._fragment_cache.pop(key, None)
+    
+    def compute_build_fingerprint(self, data_hashes: Dict[str, str]) -> Dict[str, Any]:
+        """Hash every build input: config, metrics.yaml, templates and fetched payloads"""
+        template_hashes = {}
+        for root, dirs, files in os.walk(self.templates_dir):
+            dirs.sort()
+            for file in sorted(files):
+                path = Path(root) / file
+                template_hashes[str(path.relative_to(self.templates_dir))] = hash_bytes(path.read_bytes())
+        
+        inputs = {
+            'config': hash_bytes((self.config_dir / "dashboard_config.yaml").read_bytes()),
+            'metrics': hash_bytes((self.config_dir / "metrics.yaml").read_bytes()),
+            'templates': template_hashes,
+            'data': data_hashes
+        }
+        return {'fingerprint': hash_payload(inputs), 'inputs': inputs}
+    
+    def is_build_current(self, fingerprint: Dict[str, Any]) -> bool:
+        """True if the last build used the same inputs and its outputs still exist"""
+        fingerprint_file = self.output_dir / BUILD_FINGERPRINT_FILE
+        try:
+            with open(fingerprint_file, 'r') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if previous.get('fingerprint') != fingerprint['fingerprint']:
+            return False
+        return all((self.output_dir / name).exists() for name in previous.get('outputs', []))
+    
+    def collect_metrics(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, str]]:
+        """Load configuration and fetch data for every metric
+        
+        Returns (config, metrics with their 'data', hash of each metric's data).
+        """
         # Load configuration
-        config = self.load_config()
-        metrics_config = self.load_metrics_config()
+        with self._phase('load_config'):
+            config = self.load_config()
+            metrics_config = self.load_metrics_config()
+            settings = self.load_settings().build
+        
+        # Fetch data for all metrics concurrently
+        with self._phase('fetch'):
+            fetched = self.fetch_all_metrics(metrics_config, settings)
         
-        # Fetch data for each metric
         metrics_with_data = []
+        data_hashes = {}
         for metric in metrics_config:
             logger.info(f"Processing metric: {metric['id']}")
             
-            data = None
-            if not metric.get('placeholder', True):
-                data = self.fetch_data_source(metric['data_source'])
+            data = fetched.get(metric['id'])
             
             if data is None:
                 logger.info(f"Using sample data for {metric['id']}")
-                data = self.create_sample_data(metric['id'])
+                with self._phase('sample_data'):
+                    data = self.create_sample_data(metric['id'])
+                data_hashes[metric['id']] = hash_payload(data, exclude=VOLATILE_SAMPLE_FIELDS)
+            else:
+                data_hashes[metric['id']] = hash_payload(data)
+            if self.profile:
+                self.profile.set_source(metric['id'], 'sample' if fetched.get(metric['id']) is None else 'fetched')
             
             metric['data'] = data
             metrics_with_data.append(metric)
         
-        # Load template and render
+        return config, metrics_with_data, data_hashes
+    
+    def stream_dashboard(self, config: Dict[str, Any], metrics: List[Dict[str, Any]],
+                         data_hashes: Dict[str, str], prune: bool = False) -> Iterator[str]:
+        """Render the dashboard as a stream of HTML chunks"""
         template = self.load_template("dashboard.html")
-        
-        rendered_html = template.render(
+        return template.generate(
             config=config,
-            metrics=metrics_with_data,
+            metrics=metrics,
+            tiles=self.render_metric_tiles(metrics, data_hashes, prune),
             timestamp=datetime.now().strftime('%H:%M:%S AEDT'),
             build_time=datetime.now().isoformat()
         )
+    
+    def generate_dashboard(self) -> Iterator[str]:
+        """Fetch current data and stream the rendered dashboard, without writing files"""
+        return self.stream_dashboard(*self.collect_metrics())
+    
+    def build_dashboard(self, force: bool = False) -> bool:
+        """Main build function
+        
+        Returns False without touching any file if no input changed since
+        the last build (unless `force` is set).
+        """
+        logger.info("Building P(Doom) dashboard...")
+        
+        config, metrics_with_data, data_hashes = self.collect_metrics()
+        
+        # Load the template first so a missing default is created before hashing
+        self.load_template("dashboard.html")
+        
+        with self._phase('fingerprint'):
+            fingerprint = self.compute_build_fingerprint(data_hashes)
+        if not force and self.is_build_current(fingerprint):
+            logger.info("Inputs unchanged since last build; nothing to do")
+            return False
         
-        # Write output
+        # Render straight into a temp file that replaces index.html
         output_file = self.output_dir / "index.html"
-        with open(output_file, 'w') as f:
-            f.write(rendered_html)
+        # Only the file build prunes the fragment cache, never a live render
+        chunks = self.stream_dashboard(config, metrics_with_data, data_hashes, prune=True)
+        with self._phase('render'):
+            write_stream_if_changed(output_file, chunks)
         
         logger.info(f"Dashboard built successfully: {output_file}")
         
         # Generate data manifest
-        self.generate_data_manifest(metrics_with_data)
+        with self._phase('manifest'):
+            self.generate_data_manifest(metrics_with_data)
+        
+        # Record the inputs last, so an interrupted build is redone next time
+        fingerprint['outputs'] = ["index.html", "data_manifest.json"]
+        write_if_changed(self.output_dir / BUILD_FINGERPRINT_FILE,
+                         json.dumps(fingerprint, indent=2, sort_keys=True))
+        return True
+    
+    def write_profile_report(self) -> Path:
+        """Write the profile collected so far next to data_manifest.json"""
+        report_file = self.output_dir / BUILD_PROFILE_FILE
+        write_if_changed(report_file, json.dumps(self.profile.report(), indent=2, sort_keys=True))
+        logger.info(f"Build profile written: {report_file}")
+        return report_file
     
     def generate_data_manifest(self, metrics: List[Dict[str, Any]]):
         """Generate manifest of data sources and freshness"""
@@ -370,8 +1055,7 @@ class PDoomDashboardBuilder:
             })
         
         manifest_file = self.output_dir / "data_manifest.json"
-        with open(manifest_file, 'w') as f:
-            json.dump(manifest, f, indent=2)
+        write_if_changed(manifest_file, json.dumps(manifest, indent=2))
         
         logger.info(f"Data manifest generated: {manifest_file}")
 
@@ -385,8 +1069,15 @@ def main():
     parser.add_argument("--templates-dir", default="templates", help="Templates directory")
     parser.add_argument("--output-dir", default=".", help="Output directory")
     parser.add_argument("--init", action="store_true", help="Initialize default configuration")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if no input changed")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Write per-phase and per-metric timings to {BUILD_PROFILE_FILE}")
+    parser.add_argument("--pstats", metavar="FILE",
+                        help="Dump cProfile stats of the main thread to FILE (implies --profile)")
     
     args = parser.parse_args()
+    if args.pstats:
+        args.profile = True
     
     builder = PDoomDashboardBuilder(
         config_dir=args.config_dir,
@@ -395,14 +1086,30 @@ def main():
         output_dir=args.output_dir
     )
     
-    if args.init:
-        logger.info("Initializing default configuration...")
-        builder.load_config()
-        builder.load_metrics_config()
-        builder.create_default_template()
-        logger.info("Initialization complete!")
-    else:
-        builder.build_dashboard()
+    profiler = None
+    if args.profile:
+        builder.profile = BuildProfile()
+        if args.pstats:
+            profiler = cProfile.Profile()
+            profiler.enable()
+    
+    try:
+        if args.init:
+            logger.info("Initializing default configuration...")
+            builder.load_config()
+            builder.load_metrics_config()
+            builder.create_default_template()
+            logger.info("Initialization complete!")
+        else:
+            builder.build_dashboard(force=args.force)
+    finally:
+        builder.close()
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.pstats)
+            logger.info(f"cProfile stats written: {args.pstats}")
+        if builder.profile:
+            builder.write_profile_report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Metric History Store
+
+Append-only time series of every servable metric value, kept under
+data/metadata/history as one immutable segment file per pipeline run:
+
+    b'PDHS' | uint32 header length | JSON header | times | values
+
+The header lists the run's metric names (sorted) and, per name, the row
+its points start at: the name offset index. times and values are packed
+little-endian float64 columns of the same length, grouped by name and
+sorted by time within each name, so one series is read with two seeks.
+The columns are plain buffers, so numpy.frombuffer can wrap them without
+copying where numpy is available.
+
+A run of any size writes one file. Segments pile up with every run, so
+compact() merges them into one; the merged segment names the segments it
+replaces, which readers skip, so a compaction interrupted before it
+deletes them never shows a point twice.
+"""
+
+import os
+import sys
+import json
+import time
+import bisect
+import struct
+import argparse
+from array import array
+from datetime import datetime
+
+from pipeline import metric_timestamp, parse_timestamp
+
+HISTORY_DIR = os.path.join('data', 'metadata', 'history')
+SEGMENT_SUFFIX = '.seg'
+MAGIC = b'PDHS'
+FORMAT_VERSION = 1
+HEADER_LENGTH = struct.Struct('<I')
+ITEM_SIZE = array('d').itemsize
+# append_samples compacts once this many segments are live
+COMPACT_AFTER = 64
+AGGREGATES = ('mean', 'min', 'max', 'last')
+
+# Parsed segment headers keyed by path, with the stat signature they were read at
+_segment_cache = {}
+
+class Segment:
+    """Header of one segment file and the name offset index it holds."""
+
+    def __init__(self, path, header, data_offset):
+        self.path = path
+        self.names = header['names']
+        self.starts = header['starts']
+        self.points = header['points']
+        self.replaces = header['replaces']
+        self.data_offset = data_offset
+        self.index = {name: position for position, name in enumerate(self.names)}
+
+    def span(self, position):
+        """(first row, row count) of the series at `position`"""
+        start = self.starts[position]
+        end = self.starts[position + 1] if position + 1 < len(self.starts) else self.points
+        return start, end - start
+
+    def read(self, name):
+        """Return (timestamps, values) arrays for one name, empty if absent"""
+        times, values = array('d'), array('d')
+        position = self.index.get(name)
+        if position is None:
+            return times, values
+        start, count = self.span(position)
+        with open(self.path, 'rb') as f:
+            for column, base in ((times, 0), (values, self.points)):
+                f.seek(self.data_offset + (base + start) * ITEM_SIZE)
+                column.frombytes(f.read(count * ITEM_SIZE))
+        return _little_endian(times), _little_endian(values)
+
+def _little_endian(column):
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+def _read_segment(path):
+    """Parse a segment header, reusing the cached parse while the file is unchanged"""
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _segment_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + HEADER_LENGTH.size)
+        if prefix[:len(MAGIC)] != MAGIC or len(prefix) != len(MAGIC) + HEADER_LENGTH.size:
+            raise ValueError("Not a history segment")
+        (header_length,) = HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+        header = json.loads(f.read(header_length))
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported history segment version: {header.get('version')}")
+    segment = Segment(path, header, len(prefix) + header_length)
+    _segment_cache[path] = (signature, segment)
+    return segment
+
+def _write_segment(series, history_dir, replaces=()):
+    """Write {name: (timestamps, values)} as a new segment; returns its path"""
+    names = sorted(series)
+    starts = []
+    times, values = array('d'), array('d')
+    for name in names:
+        starts.append(len(times))
+        times.extend(series[name][0])
+        values.extend(series[name][1])
+    header = {
+        'version': FORMAT_VERSION,
+        'names': names,
+        'starts': starts,
+        'points': len(times),
+        'replaces': sorted(replaces),
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(history_dir, exist_ok=True)
+    # Names sort in write order; the pid keeps concurrent writers apart
+    path = os.path.join(history_dir, f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+        f.write(_little_endian(times).tobytes())
+        f.write(_little_endian(values).tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+def _segment_files(history_dir):
+    try:
+        files = os.listdir(history_dir)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(history_dir, file) for file in sorted(files) if file.endswith(SEGMENT_SUFFIX)]
+
+def live_segments(history_dir=HISTORY_DIR):
+    """Segments in write order, minus those a compacted segment replaces"""
+    paths = _segment_files(history_dir)
+    # Forget segments another process has compacted away
+    for path in [path for path in _segment_cache if os.path.dirname(path) == history_dir]:
+        if path not in paths:
+            del _segment_cache[path]
+    segments = []
+    for path in paths:
+        try:
+            segments.append(_read_segment(path))
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read history segment {path}: {e}")
+    replaced = {name for segment in segments for name in segment.replaces}
+    return [segment for segment in segments if os.path.basename(segment.path) not in replaced]
+
+def _sort_by_time(times, values):
+    """Sort points by time, keeping write order among equal timestamps"""
+    if all(times[i] <= times[i + 1] for i in range(len(times) - 1)):
+        return times, values
+    order = sorted(range(len(times)), key=times.__getitem__)
+    return array('d', (times[i] for i in order)), array('d', (values[i] for i in order))
+
+def append(name, timestamps, values, history_dir=HISTORY_DIR):
+    """Append points to one metric's series"""
+    if len(timestamps) != len(values):
+        raise ValueError("timestamps and values must have the same length")
+    if not timestamps:
+        return
+    _write_segment({name: _sort_by_time(array('d', timestamps), array('d', values))}, history_dir)
+
+def samples_from_document(data, default_timestamp=None):
+    """Return (name, timestamp, value) for every numeric metric in a servable document"""
+    if default_timestamp is None:
+        default_timestamp = time.time()
+    samples = []
+    for metric in data.get('metrics', []):
+        value = metric.get('value')
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if not isinstance(metric.get('name'), str):
+            continue
+        timestamp = metric_timestamp(metric)
+        samples.append((metric['name'], timestamp if timestamp is not None else default_timestamp, value))
+    return samples
+
+def append_samples(samples, history_dir=HISTORY_DIR):
+    """Append (name, timestamp, value) samples as one segment, compacting when segments pile up"""
+    grouped = {}
+    for name, timestamp, value in samples:
+        times, values = grouped.setdefault(name, (array('d'), array('d')))
+        times.append(timestamp)
+        values.append(value)
+    if not grouped:
+        return 0
+    _write_segment({name: _sort_by_time(*columns) for name, columns in grouped.items()}, history_dir)
+    if len(live_segments(history_dir)) > COMPACT_AFTER:
+        compact(history_dir)
+    return len(grouped)
+
+def load_series(name, history_dir=HISTORY_DIR):
+    """Return (timestamps, values) arrays for one metric, sorted by time"""
+    times, values = array('d'), array('d')
+    for segment in live_segments(history_dir):
+        segment_times, segment_values = segment.read(name)
+        times.extend(segment_times)
+        values.extend(segment_values)
+    # Each segment is sorted, but backfilled runs may overlap earlier ones
+    return _sort_by_time(times, values)
+
+def list_series(history_dir=HISTORY_DIR):
+    """Names of every metric with recorded history"""
+    return sorted({name for segment in live_segments(history_dir) for name in segment.names})
+
+def compact(history_dir=HISTORY_DIR):
+    """Merge all live segments into one; returns how many were merged
+
+    Segments written while this runs are left alone. Two compactions of
+    the same directory must not run at once.
+    """
+    segments = live_segments(history_dir)
+    if len(segments) < 2:
+        # Finish off a compaction that stopped before deleting what it replaced
+        _remove_segments(history_dir, {name for segment in segments for name in segment.replaces})
+        return 0
+    series = {}
+    for segment in segments:
+        for name in segment.names:
+            segment_times, segment_values = segment.read(name)
+            times, values = series.setdefault(name, (array('d'), array('d')))
+            times.extend(segment_times)
+            values.extend(segment_values)
+    # Also carry over what the merged segments replace, in case an earlier
+    # compaction stopped before deleting those files
+    replaces = {os.path.basename(segment.path) for segment in segments}
+    replaces.update(name for segment in segments for name in segment.replaces
+                    if os.path.exists(os.path.join(history_dir, name)))
+    _write_segment({name: _sort_by_time(*columns) for name, columns in series.items()},
+                   history_dir, replaces)
+    _remove_segments(history_dir, replaces)
+    return len(segments)
+
+def _remove_segments(history_dir, files):
+    for file in files:
+        path = os.path.join(history_dir, file)
+        _segment_cache.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def query_range(name, start=None, end=None, history_dir=HISTORY_DIR):
+    """Return (timestamps, values) with start <= timestamp <= end (either bound optional)"""
+    times, values = load_series(name, history_dir)
+    lo = bisect.bisect_left(times, start) if start is not None else 0
+    hi = bisect.bisect_right(times, end) if end is not None else len(times)
+    return times[lo:hi], values[lo:hi]
+
+def downsample(times, values, bucket_seconds, aggregate='mean'):
+    """Aggregate points into fixed-width time buckets
+
+    Returns (bucket_starts, aggregated_values); empty buckets are omitted.
+    """
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"aggregate must be one of {', '.join(AGGREGATES)}")
+    if bucket_seconds <= 0:
+        raise ValueError("bucket_seconds must be positive")
+
+    starts = array('d')
+    aggregated = array('d')
+    index = 0
+    while index < len(times):
+        bucket = times[index] - times[index] % bucket_seconds
+        end = bisect.bisect_left(times, bucket + bucket_seconds, index)
+        chunk = values[index:end]
+        if aggregate == 'mean':
+            result = sum(chunk) / len(chunk)
+        elif aggregate == 'min':
+            result = min(chunk)
+        elif aggregate == 'max':
+            result = max(chunk)
+        else:
+            result = chunk[-1]
+        starts.append(bucket)
+        aggregated.append(result)
+        index = end
+    return starts, aggregated
+
+def trend(name, period_seconds, history_dir=HISTORY_DIR):
+    """Change of the latest value versus the last value at least `period_seconds` older
+
+    Returns None if the series does not reach back that far.
+    """
+    times, values = load_series(name, history_dir)
+    if not times:
+        return None
+    cutoff = times[-1] - period_seconds
+    index = bisect.bisect_right(times, cutoff) - 1
+    if index < 0:
+        return None
+    return values[-1] - values[index]
+
+def main():
+    parser = argparse.ArgumentParser(description='Query recorded metric history')
+    parser.add_argument('name', nargs='?', help='Metric to show; lists all metrics if omitted')
+    parser.add_argument('--since', help='Start time (ISO 8601 or epoch seconds)')
+    parser.add_argument('--until', help='End time (ISO 8601 or epoch seconds)')
+    parser.add_argument('--bucket', type=float, help='Downsample into buckets of this many seconds')
+    parser.add_argument('--aggregate', choices=AGGREGATES, default='mean')
+    parser.add_argument('--compact', action='store_true', help='Merge all history segments into one')
+
+    args = parser.parse_args()
+
+    if args.compact:
+        print(f"Merged {compact()} history segments")
+        return
+
+    if not args.name:
+        for name in list_series():
+            print(name)
+        return
+
+    bounds = []
+    for option, value in (('--since', args.since), ('--until', args.until)):
+        bound = parse_timestamp(value) if value is not None else None
+        if value is not None and bound is None:
+            parser.error(f"{option} must be an ISO 8601 timestamp or epoch seconds")
+        bounds.append(bound)
+
+    times, values = query_range(args.name, *bounds)
+    if args.bucket:
+        times, values = downsample(times, values, args.bucket, args.aggregate)
+    for timestamp, value in zip(times, values):
+        print(f"{datetime.utcfromtimestamp(timestamp).isoformat()}Z\t{value:g}")
+
+if __name__ == '__main__':
+    main()
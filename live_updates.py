@@ -0,0 +1,190 @@
+"""
+Live metric updates over Server-Sent Events.
+
+One broadcaster thread watches the servable snapshot generation and,
+when it advances, diffs the per-name latest records and fans the changed
+metrics out to every connected client. Clients poll nothing: N open
+dashboards cost one stat pass per poll interval instead of N full
+/api/data downloads.
+
+Event ids are "<boot_token>:<generation>". A reconnecting client sends
+its last id in Last-Event-ID and is replayed the events it missed from a
+bounded history; if they are gone (or the server restarted) it gets a
+fresh full snapshot instead. Each client has a bounded queue, and a
+client that falls that far behind is disconnected so it can resume.
+"""
+
+import json
+import uuid
+import queue
+import logging
+import threading
+from collections import deque
+
+import pipeline
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0        # seconds between snapshot generation checks
+HEARTBEAT_INTERVAL = 15.0  # seconds of silence before a keep-alive comment
+CLIENT_QUEUE_SIZE = 64     # events buffered per client before it is dropped
+HISTORY_SIZE = 256         # past events kept for Last-Event-ID resume
+RETRY_MS = 3000            # reconnect delay suggested to EventSource clients
+
+def format_event(event, data, event_id=None):
+    """Serialize one SSE event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+def diff_snapshots(old, new):
+    """Return (changed, removed): metrics whose latest record differs, and names that vanished."""
+    old_latest = old.latest_by_name if old is not None else {}
+    changed = {}
+    for name, (metric, _) in new.latest_by_name.items():
+        previous = old_latest.get(name)
+        if previous is None or (previous[0] is not metric and previous[0] != metric):
+            changed[name] = metric
+    removed = sorted(name for name in old_latest if name not in new.latest_by_name)
+    return changed, removed
+
+class Client:
+    """One connected stream: a bounded queue plus a flag set when it overflows."""
+
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def offer(self, text):
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            self.dropped = True
+
+class Broadcaster:
+    """Polls the servable snapshot on one thread and fans out changes."""
+
+    def __init__(self, poll_interval=POLL_INTERVAL, heartbeat_interval=HEARTBEAT_INTERVAL,
+                 queue_size=CLIENT_QUEUE_SIZE, history_size=HISTORY_SIZE):
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.queue_size = queue_size
+        self.boot_token = uuid.uuid4().hex[:8]
+        self._clients = set()
+        # (generation, event text), oldest first; complete from _history_floor onward
+        self._history = deque(maxlen=history_size)
+        self._history_floor = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def event_id(self, generation):
+        return f"{self.boot_token}:{generation}"
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-updates', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if not self._clients:
+                # Idle until the next subscriber arrives
+                self._wake.wait()
+                self._wake.clear()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Live update poll failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def poll(self):
+        """Publish a change event if the snapshot generation advanced."""
+        snapshot = pipeline.load_servable_snapshot()
+        with self._lock:
+            previous = self._snapshot
+            if previous is not None and previous.generation == snapshot.generation:
+                return
+            self._set_snapshot(snapshot)
+            if previous is None:
+                return
+            changed, removed = diff_snapshots(previous, snapshot)
+            if not changed and not removed:
+                return
+            text = format_event('metrics', {
+                'generation': snapshot.generation,
+                'changed': changed,
+                'removed': removed,
+            }, self.event_id(snapshot.generation))
+            if len(self._history) == self._history.maxlen:
+                # The oldest event is about to be evicted; ids before it can no longer resume
+                self._history_floor = self._history[0][0]
+            self._history.append((snapshot.generation, text))
+            for client in self._clients:
+                client.offer(text)
+
+    def _set_snapshot(self, snapshot):
+        if self._history_floor is None:
+            self._history_floor = snapshot.generation
+        self._snapshot = snapshot
+
+    def _snapshot_event(self, snapshot):
+        metrics = {name: metric for name, (metric, _) in snapshot.latest_by_name.items()}
+        return format_event('snapshot', {'generation': snapshot.generation, 'metrics': metrics},
+                            self.event_id(snapshot.generation))
+
+    def _replay(self, last_event_id):
+        """Events after last_event_id, or None if it cannot be resumed from history."""
+        token, _, generation = (last_event_id or '').partition(':')
+        if token != self.boot_token or not generation.isdigit():
+            return None
+        generation = int(generation)
+        if not self._history_floor <= generation <= self._snapshot.generation:
+            return None
+        return [text for event_generation, text in self._history if event_generation > generation]
+
+    def subscribe(self, last_event_id=None):
+        """Register a client and return it with the events it should receive first."""
+        client = Client(self.queue_size)
+        with self._lock:
+            if self._snapshot is None:
+                self._set_snapshot(pipeline.load_servable_snapshot())
+            backlog = self._replay(last_event_id)
+            if backlog is None:
+                backlog = [self._snapshot_event(self._snapshot)]
+            self._clients.add(client)
+            self._ensure_started()
+        self._wake.set()
+        return client, backlog
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def stream(self, last_event_id=None):
+        """Generator of SSE text for one connection."""
+        client, backlog = self.subscribe(last_event_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            for text in backlog:
+                yield text
+            while not client.dropped:
+                try:
+                    yield client.queue.get(timeout=self.heartbeat_interval)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+            # Too slow to keep up; closing lets it reconnect and resume via Last-Event-ID
+            logger.info("Dropping slow live update client")
+        finally:
+            self.unsubscribe(client)
+
+broadcaster = Broadcaster()
@@ -1,5 +1,24 @@
 import os
 import json
+import math
+import bisect
+import threading
+from datetime import datetime, timezone
+
+import zone_versions
+import servable_format
+
+SERVABLE_DIR = os.path.join('data', 'servable')
+# Symlink to the published version (see zone_versions); absent for a flat, unversioned zone
+SERVABLE_CURRENT_LINK = zone_versions.current_path(SERVABLE_DIR)
+TOY_DATA_PATH = os.path.join('data', 'raw', 'toy_data.json')
+# Written by run_pipeline after a stage finishes publishing the servable zone
+GENERATION_MARKER = '.generation'
+GENERATION_MARKER_PATH = os.path.join(SERVABLE_DIR, GENERATION_MARKER)
+# Rescans allowed when a flat zone's marker changes while the zone is being read
+MARKER_RETRIES = 3
+# Metric fields tried, in order, for a metric's timestamp
+METRIC_TIMESTAMP_FIELDS = ('timestamp', 'transformed_at', 'curated_at')
 
 def ingest_data(source_path):
     """Ingest data from a source file (raw zone)."""
@@ -24,37 +43,308 @@ def transform_data(data):
         metric['quality'] = 'high'  # Placeholder logic
     return data
 
-def serve_data():
-    """Serve data from the servable zone (production-ready data)."""
-    servable_dir = os.path.join('data', 'servable')
+def parse_timestamp(value):
+    """Convert an ISO 8601 string or epoch number to epoch seconds, or None.
+
+    NaN and infinities are rejected: they would break the sorted time index.
+    """
+    if isinstance(value, bool):
+        return None
+    if not isinstance(value, (int, float, str)):
+        return None
+    try:
+        seconds = float(value)
+    except OverflowError:
+        return None
+    except ValueError:
+        pass
+    else:
+        return seconds if math.isfinite(seconds) else None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        # Pipeline timestamps are naive UTC
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def metric_timestamp(metric):
+    """Epoch seconds of a metric record, from the first timestamp field it has."""
+    for field in METRIC_TIMESTAMP_FIELDS:
+        if field in metric:
+            return parse_timestamp(metric[field])
+    return None
+
+def _precedence(timestamp, source_file, position):
+    """Sort key deciding which record wins when a metric name repeats.
+
+    Latest timestamp wins; untimestamped records lose to timestamped ones.
+    Ties go to the later file in sorted path order, then the later record
+    within that file.
+    """
+    return (timestamp if timestamp is not None else float('-inf'), source_file, position)
+
+class ServableSnapshot:
+    """Merged view of the servable zone and the file signatures it was built from.
+
+    `source_files` lists the files metrics were loaded from and
+    `metric_sources[i]` is the index into it for metric i.
+    `metric_timestamps[i]`, if given, is metric i's parsed timestamp
+    (see metric_timestamp).
+    """
+
+    def __init__(self, generation, payload, signatures, source_files=(), metric_sources=(),
+                 metric_timestamps=None):
+        self.generation = generation
+        self.payload = payload
+        self.signatures = signatures
+        self.source_files = list(source_files)
+        self.metric_sources = list(metric_sources)
+        # Set when the zone was published (see _publish_key); freshness then checks only that
+        self.publish_key = None
+        # Epoch nanoseconds of that publish (a rollback counts as a new publish), or None
+        self.published_at = None
+        self.invalidated = False
+        self._build_index(metric_timestamps)
+
+    def _build_index(self, metric_timestamps=None):
+        """Index metric positions by name and by timestamp, and pick each name's latest record."""
+        self.positions_by_name = {}
+        self.latest_by_name = {}
+        latest_keys = {}
+        timed = []
+        metrics = self.payload['metrics']
+        if metric_timestamps is None:
+            metric_timestamps = map(metric_timestamp, metrics)
+        for position, (metric, timestamp) in enumerate(zip(metrics, metric_timestamps)):
+            name = metric.get('name')
+            self.positions_by_name.setdefault(name, []).append(position)
+            if timestamp is not None:
+                timed.append((timestamp, position))
+
+            source_file = self.source_for(position)
+            key = _precedence(timestamp, source_file or '', position)
+            if name not in latest_keys or key > latest_keys[name]:
+                latest_keys[name] = key
+                self.latest_by_name[name] = (metric, source_file)
+        timed.sort()
+        self.sorted_timestamps = [timestamp for timestamp, _ in timed]
+        self.positions_by_time = [position for _, position in timed]
+        self.timestamps = {position: timestamp for timestamp, position in timed}
+
+    def query(self, names=None, since=None):
+        """Return positions of matching metrics, in payload order.
+
+        `names` is a collection of metric names; `since` is epoch seconds
+        and keeps metrics timestamped at or after it (untimestamped
+        metrics never match). With neither, every position matches.
+        """
+        if names is not None:
+            positions = []
+            for name in set(names):
+                positions.extend(self.positions_by_name.get(name, ()))
+            if since is not None:
+                positions = [position for position in positions
+                             if position in self.timestamps and self.timestamps[position] >= since]
+            positions.sort()
+            return positions
+        if since is not None:
+            start = bisect.bisect_left(self.sorted_timestamps, since)
+            return sorted(self.positions_by_time[start:])
+        return range(len(self.payload['metrics']))
+
+    def source_for(self, position):
+        """Path of the file a metric position was loaded from, or None."""
+        if position < len(self.metric_sources):
+            return self.source_files[self.metric_sources[position]]
+        return None
+
+    def lookup(self, name):
+        """Return (latest record, source file) for a metric name, or None."""
+        return self.latest_by_name.get(name)
+
+    def is_fresh(self):
+        """Stat-only check that no file or directory has changed since the build."""
+        if self.invalidated:
+            return False
+        if self.publish_key is not None:
+            return _publish_key() == self.publish_key
+        for path, signature in self.signatures.items():
+            if _stat_signature(path) != signature:
+                return False
+        return True
+
+# Process-wide snapshot shared by every request; rebuilt only when stale.
+_snapshot = None
+_snapshot_lock = threading.Lock()
+# Cache counters for /metrics; hits are counted without the lock, so they are approximate
+_snapshot_stats = {'hits': 0, 'misses': 0}
+
+def _stat_signature(path):
+    """Return (mtime_ns, size, inode) for a path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _publish_key():
+    """Identify the published servable zone in O(1).
+
+    ('version', link target) for a versioned zone, ('marker', stat signature)
+    for a flat zone with a generation marker, or None if neither exists.
+    """
+    try:
+        return ('version', os.readlink(SERVABLE_CURRENT_LINK))
+    except OSError:
+        pass
+    marker = _stat_signature(GENERATION_MARKER_PATH)
+    return ('marker', marker) if marker is not None else None
+
+def _link_time():
+    """mtime_ns of the `current` symlink itself, which is recreated on every publish and rollback."""
+    try:
+        return os.lstat(SERVABLE_CURRENT_LINK).st_mtime_ns
+    except OSError:
+        return None
+
+def _build_servable_snapshot(generation):
+    """Scan the published servable zone.
+
+    A versioned zone is read from the version `current` points to, which
+    never changes once published. A flat zone is rescanned if its marker
+    moves during the scan, since the files read may span two publishes.
+    """
+    for _ in range(MARKER_RETRIES):
+        # Read the link time first: if `current` flips in between, the time
+        # is older than the version read, never newer
+        link_time = _link_time()
+        key = _publish_key()
+        if key is not None and key[0] == 'version':
+            zone_root = os.path.join(SERVABLE_DIR, key[1])
+            snapshot = (_load_servable_artifact(generation, zone_root)
+                        or _scan_servable_zone(generation, zone_root))
+            break
+        snapshot = _scan_servable_zone(generation, SERVABLE_DIR)
+        if _publish_key() == key:
+            break
+    snapshot.publish_key = key
+    if key is not None:
+        snapshot.published_at = link_time if key[0] == 'version' else key[1][0]
+    return snapshot
+
+def _load_servable_artifact(generation, zone_root):
+    """Build the snapshot from a version's binary copy (see servable_format), if it has one.
+
+    Returns None when there is no usable artifact, so the caller falls back
+    to walking the JSON documents.
+    """
+    fmt, path = servable_format.find_artifact(zone_root)
+    if fmt is None:
+        return None
+    try:
+        documents, all_metrics, metric_sources, timestamps = servable_format.read_artifact(fmt, path)
+    except Exception as e:
+        print(f"Warning: Could not load {path}, reading JSON instead: {e}")
+        return None
+    if not all_metrics:
+        return None
     
-    # Look for all JSON files in servable zone
+    payload = {
+        'metrics': all_metrics,
+        'source': 'servable_zone',
+        'count': len(all_metrics)
+    }
+    source_files = [os.path.join(zone_root, rel_path) for rel_path in documents]
+    signatures = {zone_root: _stat_signature(zone_root), path: _stat_signature(path)}
+    return ServableSnapshot(generation, payload, signatures, source_files, metric_sources, timestamps)
+
+def _scan_servable_zone(generation, zone_root):
+    """Walk a servable zone directory, load every JSON file and merge their metrics."""
     all_metrics = []
+    source_files = []
+    metric_sources = []
+    # Directories are recorded too, so added or removed files change a signature
+    signatures = {zone_root: _stat_signature(zone_root)}
     
-    if os.path.exists(servable_dir):
-        for root, dirs, files in os.walk(servable_dir):
-            for file in files:
+    if os.path.exists(zone_root):
+        for root, dirs, files in os.walk(zone_root):
+            if root == SERVABLE_DIR:
+                # Unpublished or old versions are not part of a flat zone
+                dirs[:] = [d for d in dirs if d != zone_versions.VERSIONS_DIR]
+            dirs.sort()
+            signatures[root] = _stat_signature(root)
+            for file in sorted(files):
                 if file.endswith('.json'):
                     file_path = os.path.join(root, file)
+                    signatures[file_path] = _stat_signature(file_path)
                     try:
                         with open(file_path, 'r') as f:
                             data = json.load(f)
                             if 'metrics' in data:
                                 all_metrics.extend(data['metrics'])
+                                metric_sources.extend([len(source_files)] * len(data['metrics']))
+                                source_files.append(file_path)
                     except Exception as e:
                         print(f"Warning: Could not load {file_path}: {e}")
     
     # If no servable data exists, fall back to toy data for demo
     if not all_metrics:
         print("No servable data found, using toy data")
-        toy_path = os.path.join('data', 'raw', 'toy_data.json')
-        if os.path.exists(toy_path):
-            with open(toy_path, 'r') as f:
+        signatures[TOY_DATA_PATH] = _stat_signature(TOY_DATA_PATH)
+        if os.path.exists(TOY_DATA_PATH):
+            with open(TOY_DATA_PATH, 'r') as f:
                 toy_data = json.load(f)
                 all_metrics = toy_data.get('metrics', [])
+                source_files = [TOY_DATA_PATH]
+                metric_sources = [0] * len(all_metrics)
     
-    return {
+    payload = {
         'metrics': all_metrics,
         'source': 'servable_zone',
         'count': len(all_metrics)
     }
+    return ServableSnapshot(generation, payload, signatures, source_files, metric_sources)
+
+def load_servable_snapshot():
+    """Return the current servable snapshot, rebuilding it only if files changed."""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_fresh():
+        _snapshot_stats['hits'] += 1
+        return snapshot
+    
+    with _snapshot_lock:
+        # Another thread may have rebuilt while we waited for the lock
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.is_fresh():
+            _snapshot_stats['hits'] += 1
+            return snapshot
+        _snapshot_stats['misses'] += 1
+        generation = snapshot.generation + 1 if snapshot is not None else 1
+        _snapshot = _build_servable_snapshot(generation)
+        return _snapshot
+
+def snapshot_stats():
+    """Return snapshot cache hit/miss counts and the current generation."""
+    snapshot = _snapshot
+    return {
+        'hits': _snapshot_stats['hits'],
+        'misses': _snapshot_stats['misses'],
+        'generation': snapshot.generation if snapshot is not None else 0,
+    }
+
+def invalidate_servable_snapshot():
+    """Drop the cached snapshot so the next request rebuilds it."""
+    with _snapshot_lock:
+        if _snapshot is not None:
+            # Keep the old snapshot so the generation counter keeps increasing
+            _snapshot.invalidated = True
+
+def serve_data():
+    """Serve data from the servable zone (production-ready data).
+    
+    The returned dict is shared between callers and must not be mutated.
+    """
+    return load_servable_snapshot().payload
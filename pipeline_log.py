@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Pipeline Run Log
+
+Append-only JSONL log of pipeline stage runs. Each run adds one compact
+line to pipeline_log.jsonl and one line per touched file to
+pipeline_files.jsonl. Both files rotate by size, so writes never read
+or rewrite earlier entries.
+"""
+
+import os
+import json
+import uuid
+import argparse
+from datetime import datetime
+
+LOG_DIR = os.path.join('data', 'metadata')
+RUN_LOG_FILE = 'pipeline_log.jsonl'
+FILE_LOG_FILE = 'pipeline_files.jsonl'
+MAX_LOG_BYTES = 1024 * 1024
+BACKUP_COUNT = 5
+
+def rotate_log(path, backup_count=BACKUP_COUNT):
+    """Shift path -> path.1 -> path.2 ..., dropping the oldest backup"""
+    for index in range(backup_count - 1, 0, -1):
+        older = f"{path}.{index}"
+        if os.path.exists(older):
+            os.replace(older, f"{path}.{index + 1}")
+    if os.path.exists(path):
+        os.replace(path, f"{path}.1")
+
+def append_records(path, records, max_bytes=MAX_LOG_BYTES, backup_count=BACKUP_COUNT):
+    """Append JSON records as lines, rotating first if the file would grow too large"""
+    if not records:
+        return
+    payload = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+    payload = payload.encode('utf-8')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if size and size + len(payload) > max_bytes:
+        rotate_log(path, backup_count)
+
+    with open(path, 'ab') as f:
+        f.write(payload)
+
+def log_run(stage, action, files, dry_run=False, errors=None, log_dir=LOG_DIR):
+    """Record one stage run and its per-file details; returns the run entry"""
+    errors = errors or []
+    run_id = uuid.uuid4().hex[:12]
+    entry = {
+        'run_id': run_id,
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'stage': stage,
+        'action': action,
+        'files_processed': len(files),
+        'files_failed': len(errors),
+        'dry_run': dry_run
+    }
+
+    if not dry_run:
+        details = [{'run_id': run_id, 'file': file, 'status': 'processed'} for file in files]
+        details.extend({'run_id': run_id, 'file': error['file'], 'status': 'error',
+                        'error': error['error']} for error in errors)
+        append_records(os.path.join(log_dir, FILE_LOG_FILE), details)
+        append_records(os.path.join(log_dir, RUN_LOG_FILE), [entry])
+
+    return entry
+
+def read_lines_reversed(path, block_size=64 * 1024):
+    """Yield the lines of a file from last to first, reading from the end"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b'\n')
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if remainder:
+            yield remainder
+
+def iter_records_reversed(path, backup_count=BACKUP_COUNT):
+    """Yield records newest first across the live log and its backups"""
+    for candidate in [path] + [f"{path}.{index}" for index in range(1, backup_count + 1)]:
+        if not os.path.exists(candidate):
+            continue
+        for line in read_lines_reversed(candidate):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn trailing line from an interrupted write
+                continue
+
+def tail_runs(limit=10, log_dir=LOG_DIR):
+    """Return the last `limit` run entries, oldest first"""
+    runs = []
+    for record in iter_records_reversed(os.path.join(log_dir, RUN_LOG_FILE)):
+        if len(runs) >= limit:
+            break
+        runs.append(record)
+    runs.reverse()
+    return runs
+
+def run_files(run_id, log_dir=LOG_DIR):
+    """Return the per-file detail records for one run"""
+    details = []
+    for record in iter_records_reversed(os.path.join(log_dir, FILE_LOG_FILE)):
+        if record.get('run_id') == run_id:
+            details.append(record)
+        elif details:
+            # Details of one run are written contiguously
+            break
+    details.reverse()
+    return details
+
+def main():
+    parser = argparse.ArgumentParser(description='Show recent pipeline runs')
+    parser.add_argument('--tail', type=int, default=10, help='Number of runs to show')
+    parser.add_argument('--files', action='store_true', help='Include per-file details')
+
+    args = parser.parse_args()
+
+    for run in tail_runs(args.tail):
+        print(json.dumps(run))
+        if args.files:
+            for detail in run_files(run['run_id']):
+                print(f"    {json.dumps(detail)}")
+
+if __name__ == '__main__':
+    main()
@@ -8,10 +8,24 @@ Supports dry-run mode for testing without making changes.
 
 import os
 import json
+import uuid
+import hashlib
 import shutil
 import yaml
 from datetime import datetime
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pipeline
+import pipeline_log
+import history_store
+import zone_versions
+import servable_format
+
+METADATA_DIR = os.path.join('data', 'metadata')
+ZONE_CONFIG_PATH = os.path.join('config', 'data_zones.yaml')
+DEFAULT_VERSIONS_TO_KEEP = 5
+DEFAULT_BINARY_FORMAT = 'columnar'
 
 def load_pipeline_config():
     """Load pipeline configuration"""
@@ -21,36 +35,491 @@ def load_pipeline_config():
             return yaml.safe_load(f)
     return {}
 
-def log_pipeline_action(stage, action, files, dry_run=False):
-    """Log pipeline actions"""
-    log_entry = {
-        'timestamp': datetime.utcnow().isoformat() + 'Z',
+def log_pipeline_action(stage, action, files, dry_run=False, errors=None):
+    """Log pipeline actions to the append-only run log"""
+    return pipeline_log.log_run(stage, action, files, dry_run, errors, log_dir=METADATA_DIR)
+
+class InvalidDocument(Exception):
+    """Raised by a stage processor when a document cannot enter the next zone"""
+
+def curate_document(data):
+    """Validate and clean one raw document in place"""
+    # Basic validation
+    if 'metrics' not in data:
+        raise InvalidDocument("Missing 'metrics' field")
+    
+    # Clean and validate metrics
+    clean_metrics = []
+    for metric in data.get('metrics', []):
+        if 'name' in metric and 'value' in metric:
+            # Add quality metadata
+            metric['curated_at'] = datetime.utcnow().isoformat() + 'Z'
+            metric['quality_check'] = 'passed'
+            clean_metrics.append(metric)
+    
+    data['metrics'] = clean_metrics
+    data['curated_at'] = datetime.utcnow().isoformat() + 'Z'
+    data['stage'] = 'curated'
+    return f"{len(clean_metrics)} metrics validated"
+
+def transform_document(data):
+    """Enrich one curated document in place"""
+    # Add transformations (example)
+    for metric in data.get('metrics', []):
+        # Add computed fields
+        metric['transformed_at'] = datetime.utcnow().isoformat() + 'Z'
+        # Example: categorize values
+        value = metric.get('value', 0)
+        if isinstance(value, (int, float)):
+            if value > 1000:
+                metric['magnitude'] = 'high'
+            elif value > 100:
+                metric['magnitude'] = 'medium'
+            else:
+                metric['magnitude'] = 'low'
+    
+    data['transformed_at'] = datetime.utcnow().isoformat() + 'Z'
+    data['stage'] = 'transformed'
+    return f"Transformed {len(data.get('metrics', []))} metrics"
+
+def serve_document(data):
+    """Prepare one transformed document for serving in place"""
+    # Final preparation for serving
+    data['served_at'] = datetime.utcnow().isoformat() + 'Z'
+    data['stage'] = 'servable'
+    data['ready_for_dashboard'] = True
+    return "Ready for dashboard serving"
+
+def stage_manifest_path(stage):
+    """Path of the incremental manifest for a stage"""
+    return os.path.join(METADATA_DIR, f'{stage}_manifest.json')
+
+def load_stage_manifest(stage):
+    """Load the input-hash manifest recorded by the last run of a stage"""
+    manifest_file = stage_manifest_path(stage)
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+    return {'stage': stage, 'files': {}}
+
+def save_stage_manifest(stage, files):
+    """Record input hashes and output paths for the files a stage produced"""
+    manifest_file = stage_manifest_path(stage)
+    manifest = {
         'stage': stage,
-        'action': action,
-        'files_processed': len(files),
-        'files': files,
-        'dry_run': dry_run
+        'updated_at': datetime.utcnow().isoformat() + 'Z',
+        'files': files
     }
+    write_json(manifest_file, manifest, sort_keys=True)
+
+def iter_json_files(zone_dir):
+    """Yield (path, path relative to zone) for every JSON file, in sorted order"""
+    for root, dirs, files in os.walk(zone_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.json'):
+                file_path = os.path.join(root, file)
+                yield file_path, os.path.relpath(file_path, zone_dir)
+
+def iter_selected_files(zone_dir, rel_paths):
+    """Like iter_json_files, but only for the given relative paths that still exist"""
+    for rel_path in sorted(set(rel_paths)):
+        file_path = os.path.join(zone_dir, rel_path)
+        if rel_path.endswith('.json') and os.path.isfile(file_path):
+            yield file_path, rel_path
+
+def process_file(task):
+    """Run a chain of stage processors over one file and write its output
+    
+    Each step is (processor, materialize_file); the document is passed from
+    step to step in memory, and an intermediate copy is only written when
+    materialize_file is set. Executed inside a worker, so it only returns a
+    result record and leaves all printing and bookkeeping to run_stage.
+    With collect_samples set, the result also carries the output's metric
+    values for the history store. The output is written to dst_file and
+    recorded in the manifest as output_path, which differ when the stage
+    publishes a versioned zone. `step_hashes` in the result holds the
+    content hash of each materialized copy (None for other steps).
+    """
+    steps, src_file, rel_path, dst_file, output_path, entry, dry_run, collect_samples = task
+    result = {'rel_path': rel_path, 'status': 'error', 'message': None, 'entry': None,
+              'samples': None, 'step_hashes': None}
+    
+    try:
+        with open(src_file, 'rb') as f:
+            raw = f.read()
+        input_hash = 'sha256:' + hashlib.sha256(raw).hexdigest()
+        
+        if (entry and entry['input_hash'] == input_hash
+                and os.path.exists(dst_file)):
+            result.update(status='unchanged', entry=entry)
+            return result
+        
+        data = json.loads(raw)
+        messages = []
+        materialized = []
+        step_hashes = []
+        for processor, materialize_file in steps:
+            messages.append(processor(data))
+            step_hash = None
+            if materialize_file:
+                text = json.dumps(data, indent=2)
+                # The hash the next stage computes when it reads this copy
+                step_hash = 'sha256:' + hashlib.sha256(text.encode('utf-8')).hexdigest()
+                if not dry_run:
+                    write_atomic(materialize_file, text)
+                materialized.append(materialize_file)
+            step_hashes.append(step_hash)
+        
+        if not dry_run:
+            write_json(dst_file, data)
+        
+        new_entry = {'input_hash': input_hash, 'output_path': output_path}
+        if materialized:
+            new_entry['materialized'] = materialized
+        if collect_samples:
+            result['samples'] = history_store.samples_from_document(data)
+        result.update(status='processed', message=' -> '.join(messages), entry=new_entry,
+                      step_hashes=step_hashes)
+    except InvalidDocument as e:
+        result.update(status='invalid', message=str(e))
+    except Exception as e:
+        result['message'] = f"Error - {e}"
+    return result
+
+def write_atomic(path, content):
+    """Write a file so concurrent readers see the old or the new content, never a mix
     
-    log_file = os.path.join('data', 'metadata', 'pipeline_log.json')
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    The content (text or bytes) goes to a hidden temp file in the same
+    directory, is fsynced, and then renamed over the target, creating
+    parent directories as needed.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # Hidden and not *.json, so zone walks never pick it up
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp_path, 'xb' if isinstance(content, bytes) else 'x') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_json(path, data, sort_keys=False):
+    """Atomically write a zone document or metadata file"""
+    write_atomic(path, json.dumps(data, indent=2, sort_keys=sort_keys))
+
+def write_generation_marker(zone_dir, stage):
+    """Bump the zone's generation marker once a stage has finished writing it
+    
+    Readers (pipeline.load_servable_snapshot) stat only this file to decide
+    whether the zone changed, so they switch to the new contents all at once.
+    """
+    marker_path = os.path.join(zone_dir, pipeline.GENERATION_MARKER)
+    generation = 0
+    try:
+        with open(marker_path, 'r') as f:
+            generation = json.load(f)['generation']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    write_json(marker_path, {
+        'generation': generation + 1,
+        'stage': stage,
+        'published_at': datetime.utcnow().isoformat() + 'Z'
+    })
+    return generation + 1
+
+def load_zone_config():
+    """Load config/data_zones.yaml, or an empty config if it is missing"""
+    if not os.path.exists(ZONE_CONFIG_PATH):
+        return {}
+    with open(ZONE_CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+def servable_versions_to_keep():
+    """Number of servable versions kept for rollback (servable.versions_to_keep)"""
+    servable = load_zone_config().get('servable') or {}
+    return max(1, int(servable.get('versions_to_keep', DEFAULT_VERSIONS_TO_KEEP)))
+
+def servable_binary_format():
+    """Binary copy written with each servable version (servable.binary_format)"""
+    servable = load_zone_config().get('servable') or {}
+    fmt = servable.get('binary_format', DEFAULT_BINARY_FORMAT)
+    # An empty value (or YAML false) disables it like `none`
+    fmt = str(fmt).lower() if fmt else 'none'
+    if fmt not in servable_format.FORMATS:
+        print(f"Warning: Unknown servable.binary_format '{fmt}', writing JSON only")
+        return 'none'
+    if fmt not in servable_format.available_formats():
+        print(f"Warning: servable.binary_format '{fmt}' needs the {fmt} package, writing JSON only")
+        return 'none'
+    return fmt
+
+def write_servable_artifact(version_dir, changed):
+    """Write a version's binary copy of its metrics; returns its path, or None if disabled
+    
+    Rows for documents that are not in `changed` are taken from the copy
+    seeded from the previous version, so only changed documents are parsed.
+    """
+    fmt = servable_binary_format()
+    previous = {}
+    seeded_format, seeded_path = servable_format.find_artifact(version_dir)
+    if seeded_format == fmt:
+        try:
+            documents, metrics, doc_index, timestamps = servable_format.read_artifact(fmt, seeded_path)
+            previous = {rel_path: ([], []) for rel_path in documents}
+            for metric, index, timestamp in zip(metrics, doc_index, timestamps):
+                rows, row_timestamps = previous[documents[index]]
+                rows.append(metric)
+                row_timestamps.append(timestamp)
+        except Exception as e:
+            print(f"  - Could not reuse {seeded_path} ({e}), rebuilding it")
+            previous = {}
+    # Seeded copies describe the previous version's contents
+    for name in servable_format.ARTIFACT_NAMES.values():
+        if os.path.exists(os.path.join(version_dir, name)):
+            os.remove(os.path.join(version_dir, name))
+    if fmt == 'none':
+        return None
+    
+    documents, metrics, doc_index, timestamps = [], [], [], []
+    for file_path, rel_path in iter_json_files(version_dir):
+        if rel_path in previous and rel_path not in changed:
+            rows, row_timestamps = previous[rel_path]
+        else:
+            try:
+                with open(file_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict) or 'metrics' not in data:
+                continue
+            rows = data['metrics']
+            row_timestamps = [pipeline.metric_timestamp(metric) for metric in rows]
+        doc_index.extend([len(documents)] * len(rows))
+        documents.append(rel_path)
+        metrics.extend(rows)
+        timestamps.extend(row_timestamps)
+    
+    path = os.path.join(version_dir, servable_format.ARTIFACT_NAMES[fmt])
+    write_atomic(path, servable_format.encode(fmt, documents, metrics, doc_index, timestamps))
+    return path
+
+def version_manifest_path(version_dir, stage):
+    """Copy of the stage manifest that matches a version's contents (not *.json, so never served)"""
+    return os.path.join(version_dir, f'.{stage}_manifest')
+
+def publish_version(stage, zone_dir, version_dir, entries, changed=()):
+    """Stamp a finished version, flip the zone's `current` link to it and prune old versions
+    
+    `changed` lists the documents (relative paths) written or removed by
+    this run; the binary copy is rebuilt for those only.
+    """
+    artifact = write_servable_artifact(version_dir, set(changed))
+    if artifact:
+        print(f"  - Wrote {os.path.basename(artifact)} ({os.path.getsize(artifact)} bytes)")
+    generation = write_generation_marker(version_dir, stage)
+    # Manifest copies seeded from the previous version no longer describe this one
+    for file in os.listdir(version_dir):
+        if file.startswith('.') and file.endswith('_manifest'):
+            os.remove(os.path.join(version_dir, file))
+    write_json(version_manifest_path(version_dir, stage), {'stage': stage, 'files': entries})
+    zone_versions.publish(zone_dir, version_dir)
+    print(f"  - Published {zone_dir} version {os.path.basename(version_dir)} (generation {generation})")
+    for version in zone_versions.prune(zone_dir, servable_versions_to_keep()):
+        print(f"  - Pruned old version {version}")
+
+def rollback_servable(version=None):
+    """Re-publish an older servable version and restore the manifests that match it"""
+    servable_dir = os.path.join('data', 'servable')
+    try:
+        version = zone_versions.rollback(servable_dir, version)
+    except ValueError as e:
+        print(f"✗ Rollback failed: {e}")
+        return None
+    
+    version_dir = os.path.join(zone_versions.versions_path(servable_dir), version)
+    for stage in ('serve', 'fused'):
+        saved = version_manifest_path(version_dir, stage)
+        if os.path.exists(saved):
+            with open(saved, 'r') as f:
+                save_stage_manifest(stage, json.load(f)['files'])
+        elif os.path.exists(stage_manifest_path(stage)):
+            # No record of what this stage produced for that version; rebuild next run
+            os.remove(stage_manifest_path(stage))
+    print(f"Rolled back {servable_dir} to version {version}")
+    log_pipeline_action('serve', 'rollback', [version])
+    return version
+
+def map_files(tasks, workers=1, executor='thread'):
+    """Apply process_file to every task, in order, optionally on a worker pool"""
+    if workers <= 1 or len(tasks) <= 1:
+        return list(map(process_file, tasks))
     
-    if os.path.exists(log_file):
-        with open(log_file, 'r') as f:
-            log_data = json.load(f)
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    # Larger chunks amortise pickling overhead when fanning out to processes
+    chunksize = max(1, len(tasks) // (workers * 4)) if executor == 'process' else 1
+    with pool_class(max_workers=workers) as pool:
+        return list(pool.map(process_file, tasks, chunksize=chunksize))
+
+def run_stage(stage, action, src_dir, dst_dir, steps, dry_run=False, force=False,
+              workers=1, executor='thread', history=False, only=None, publish=False,
+              step_stages=None):
+    """Run one stage over every file in src_dir, skipping unchanged inputs
+    
+    A file is reprocessed only if its content hash differs from the one in
+    the stage manifest or its output is missing. Outputs whose inputs have
+    vanished since the last run are deleted. Files are handled on up to
+    `workers` threads or processes; results are reported in path order.
+    
+    `steps` is a list of (processor, materialize_dir) pairs applied to each
+    document in turn; see process_file. With `history` set, the metric
+    values of every processed file are appended to the history store.
+    
+    `only` restricts the run to a collection of paths relative to the zone;
+    manifest entries for every other file are kept as they are.
+    
+    With `publish` set, dst_dir is versioned (see zone_versions): the run
+    writes into a new version seeded from the current one and, if anything
+    changed, bumps its generation marker, flips dst_dir/current to it and
+    prunes old versions. Manifest output paths point through `current`.
+    
+    `step_stages` names, per step, the staged manifest to update for its
+    output (see update_step_manifests), so fused runs with materialized
+    zones stay in step with staged runs.
+    """
+    manifest = load_stage_manifest(stage)
+    previous = {} if force else manifest['files']
+    
+    write_dir = output_dir = dst_dir
+    version_dir = None
+    if publish:
+        output_dir = zone_versions.current_path(dst_dir)
+        if dry_run:
+            write_dir = output_dir
+        else:
+            version_dir = write_dir = zone_versions.create_version(dst_dir)
+    
+    if only is None:
+        candidates = iter_json_files(src_dir)
     else:
-        log_data = {'pipeline_runs': []}
+        only = set(only)
+        candidates = iter_selected_files(src_dir, only)
+    
+    tasks = []
+    for src_file, rel_path in candidates:
+        dst_file = os.path.join(write_dir, rel_path)
+        output_path = os.path.join(output_dir, rel_path)
+        file_steps = [(processor, os.path.join(materialize_dir, rel_path) if materialize_dir else None)
+                      for processor, materialize_dir in steps]
+        tasks.append((file_steps, src_file, rel_path, dst_file, output_path, previous.get(rel_path),
+                      dry_run, history))
     
-    log_data['pipeline_runs'].append(log_entry)
-    log_data['pipeline_runs'] = log_data['pipeline_runs'][-100:]  # Keep last 100
+    # A partial run starts from the existing manifest and updates it
+    entries = {} if only is None else dict(manifest['files'])
+    processed_files = []
+    processed_results = []
+    errors = []
+    samples = []
+    removed = []
+    unchanged = 0
+    
+    for result in map_files(tasks, workers, executor):
+        rel_path = result['rel_path']
+        if result['status'] == 'unchanged':
+            unchanged += 1
+        elif result['status'] == 'processed':
+            print(f"  ✓ {rel_path}: {result['message']}")
+            processed_files.append(rel_path)
+            processed_results.append(result)
+            if result['samples']:
+                samples.extend(result['samples'])
+        else:
+            print(f"  ✗ {rel_path}: {result['message']}")
+            errors.append({'file': rel_path, 'error': result['message']})
+        if result['entry']:
+            entries[rel_path] = result['entry']
+        elif rel_path in manifest['files']:
+            # A failed file keeps its last good entry: that output is still on
+            # disk and must be deleted if the input is removed later
+            entries[rel_path] = manifest['files'][rel_path]
+        else:
+            entries.pop(rel_path, None)
+
+    if unchanged:
+        print(f"  - {unchanged} unchanged files skipped")
+    if errors:
+        print(f"  ✗ {len(errors)} files failed")
+    
+    # Remove outputs whose inputs no longer exist
+    seen = {task[2] for task in tasks}
+    for rel_path, entry in sorted(manifest['files'].items()):
+        if rel_path in seen or (only is not None and rel_path not in only):
+            continue
+        entries.pop(rel_path, None)
+        removed.append(rel_path)
+        print(f"  - {rel_path}: Input removed, deleting {entry['output_path']}")
+        # Delete from the write location; a published version is never modified
+        for output_path in [os.path.join(write_dir, rel_path)] + entry.get('materialized', []):
+            if not dry_run and os.path.exists(output_path):
+                os.remove(output_path)
     
     if not dry_run:
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        if version_dir is not None:
+            if processed_files or removed:
+                publish_version(stage, dst_dir, version_dir, entries, processed_files + removed)
+            else:
+                zone_versions.discard(version_dir)
+        save_stage_manifest(stage, entries)
+        if step_stages:
+            update_step_manifests(step_stages, steps, processed_results, removed)
+        if samples:
+            # History is secondary: the zone is already published, so never fail the stage here
+            try:
+                series = history_store.append_samples(samples)
+                print(f"  - Recorded {len(samples)} values across {series} metrics in history")
+            except Exception as e:
+                print(f"  ✗ Could not record metric history: {e}")
     
-    return log_entry
+    log_pipeline_action(stage, action, processed_files, dry_run, errors)
+    return processed_files
 
-def curate_data(dry_run=False):
+def update_step_manifests(step_stages, steps, results, removed):
+    """Record the outputs of a multi-step run in each step's own stage manifest
+    
+    Step k counts as a run of stage step_stages[k] for a file when both its
+    input (the source file for the first step, otherwise step k-1's
+    materialized copy) and its output (its materialized copy, or the run's
+    output for the last step) are on disk. A later staged run then skips
+    those files instead of redoing them.
+    """
+    last = len(steps) - 1
+    for index, stage in enumerate(step_stages):
+        if stage is None:
+            continue
+        files = load_stage_manifest(stage)['files']
+        for result in results:
+            rel_path = result['rel_path']
+            input_hash = result['entry']['input_hash'] if index == 0 else result['step_hashes'][index - 1]
+            materialize_dir = steps[index][1]
+            if index == last:
+                output_path = result['entry']['output_path']
+            elif materialize_dir:
+                output_path = os.path.join(materialize_dir, rel_path)
+            else:
+                output_path = None
+            if input_hash and output_path:
+                files[rel_path] = {'input_hash': input_hash, 'output_path': output_path}
+        # The run deleted these outputs, materialized copies included
+        for rel_path in removed:
+            files.pop(rel_path, None)
+        save_stage_manifest(stage, files)
+
+def curate_data(dry_run=False, force=False, workers=1, executor='thread', only=None):
     """Stage 1: Raw -> Curated (validate and clean)"""
     print("=== CURATION STAGE: Raw -> Curated ===")
     
@@ -61,54 +530,10 @@ def curate_data(dry_run=False):
         print("No raw data directory found")
         return []
     
-    processed_files = []
-    
-    for root, dirs, files in os.walk(raw_dir):
-        for file in files:
-            if file.endswith('.json'):
-                raw_file = os.path.join(root, file)
-                rel_path = os.path.relpath(raw_file, raw_dir)
-                curated_file = os.path.join(curated_dir, rel_path)
-                
-                try:
-                    # Load and validate
-                    with open(raw_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Basic validation
-                    if 'metrics' not in data:
-                        print(f"  ✗ {rel_path}: Missing 'metrics' field")
-                        continue
-                    
-                    # Clean and validate metrics
-                    clean_metrics = []
-                    for metric in data.get('metrics', []):
-                        if 'name' in metric and 'value' in metric:
-                            # Add quality metadata
-                            metric['curated_at'] = datetime.utcnow().isoformat() + 'Z'
-                            metric['quality_check'] = 'passed'
-                            clean_metrics.append(metric)
-                    
-                    data['metrics'] = clean_metrics
-                    data['curated_at'] = datetime.utcnow().isoformat() + 'Z'
-                    data['stage'] = 'curated'
-                    
-                    print(f"  ✓ {rel_path}: {len(clean_metrics)} metrics validated")
-                    
-                    if not dry_run:
-                        os.makedirs(os.path.dirname(curated_file), exist_ok=True)
-                        with open(curated_file, 'w') as f:
-                            json.dump(data, f, indent=2)
-                    
-                    processed_files.append(rel_path)
-                    
-                except Exception as e:
-                    print(f"  ✗ {rel_path}: Error - {e}")
-    
-    log_pipeline_action('curate', 'raw_to_curated', processed_files, dry_run)
-    return processed_files
+    return run_stage('curate', 'raw_to_curated', raw_dir, curated_dir,
+                     [(curate_document, None)], dry_run, force, workers, executor, only=only)
 
-def transform_data(dry_run=False):
+def transform_data(dry_run=False, force=False, workers=1, executor='thread', only=None):
     """Stage 2: Curated -> Transformed (aggregate and enrich)"""
     print("=== TRANSFORMATION STAGE: Curated -> Transformed ===")
     
@@ -119,52 +544,10 @@ def transform_data(dry_run=False):
         print("No curated data directory found")
         return []
     
-    processed_files = []
-    
-    for root, dirs, files in os.walk(curated_dir):
-        for file in files:
-            if file.endswith('.json'):
-                curated_file = os.path.join(root, file)
-                rel_path = os.path.relpath(curated_file, curated_dir)
-                transformed_file = os.path.join(transformed_dir, rel_path)
-                
-                try:
-                    with open(curated_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Add transformations (example)
-                    for metric in data.get('metrics', []):
-                        # Add computed fields
-                        metric['transformed_at'] = datetime.utcnow().isoformat() + 'Z'
-                        # Example: categorize values
-                        value = metric.get('value', 0)
-                        if isinstance(value, (int, float)):
-                            if value > 1000:
-                                metric['magnitude'] = 'high'
-                            elif value > 100:
-                                metric['magnitude'] = 'medium'
-                            else:
-                                metric['magnitude'] = 'low'
-                    
-                    data['transformed_at'] = datetime.utcnow().isoformat() + 'Z'
-                    data['stage'] = 'transformed'
-                    
-                    print(f"  ✓ {rel_path}: Transformed {len(data.get('metrics', []))} metrics")
-                    
-                    if not dry_run:
-                        os.makedirs(os.path.dirname(transformed_file), exist_ok=True)
-                        with open(transformed_file, 'w') as f:
-                            json.dump(data, f, indent=2)
-                    
-                    processed_files.append(rel_path)
-                    
-                except Exception as e:
-                    print(f"  ✗ {rel_path}: Error - {e}")
-    
-    log_pipeline_action('transform', 'curated_to_transformed', processed_files, dry_run)
-    return processed_files
+    return run_stage('transform', 'curated_to_transformed', curated_dir, transformed_dir,
+                     [(transform_document, None)], dry_run, force, workers, executor, only=only)
 
-def serve_data_stage(dry_run=False):
+def serve_data_stage(dry_run=False, force=False, workers=1, executor='thread', only=None):
     """Stage 3: Transformed -> Servable (production ready)"""
     print("=== SERVING STAGE: Transformed -> Servable ===")
     
@@ -175,47 +558,46 @@ def serve_data_stage(dry_run=False):
         print("No transformed data directory found")
         return []
     
-    processed_files = []
+    return run_stage('serve', 'transformed_to_servable', transformed_dir, servable_dir,
+                     [(serve_document, None)], dry_run, force, workers, executor, history=True,
+                     only=only, publish=True)
+
+def run_fused_pipeline(dry_run=False, force=False, workers=1, executor='thread',
+                       materialize=False, only=None):
+    """Raw -> Servable in a single pass, chaining all stages in memory
     
-    for root, dirs, files in os.walk(transformed_dir):
-        for file in files:
-            if file.endswith('.json'):
-                transformed_file = os.path.join(root, file)
-                rel_path = os.path.relpath(transformed_file, transformed_dir)
-                servable_file = os.path.join(servable_dir, rel_path)
-                
-                try:
-                    with open(transformed_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Final preparation for serving
-                    data['served_at'] = datetime.utcnow().isoformat() + 'Z'
-                    data['stage'] = 'servable'
-                    data['ready_for_dashboard'] = True
-                    
-                    print(f"  ✓ {rel_path}: Ready for dashboard serving")
-                    
-                    if not dry_run:
-                        os.makedirs(os.path.dirname(servable_file), exist_ok=True)
-                        with open(servable_file, 'w') as f:
-                            json.dump(data, f, indent=2)
-                    
-                    processed_files.append(rel_path)
-                    
-                except Exception as e:
-                    print(f"  ✗ {rel_path}: Error - {e}")
-    
-    log_pipeline_action('serve', 'transformed_to_servable', processed_files, dry_run)
-    return processed_files
+    Only the servable zone is written unless `materialize` is set, in which
+    case the curated and transformed copies are written as well and the
+    curate, transform and serve manifests are updated to match, so a later
+    staged run does not redo the work.
+    """
+    print("=== FUSED STAGE: Raw -> Servable ===")
+    
+    raw_dir = os.path.join('data', 'raw')
+    
+    if not os.path.exists(raw_dir):
+        print("No raw data directory found")
+        return []
+    
+    curated_dir = os.path.join('data', 'curated') if materialize else None
+    transformed_dir = os.path.join('data', 'transformed') if materialize else None
+    steps = [
+        (curate_document, curated_dir),
+        (transform_document, transformed_dir),
+        (serve_document, None),
+    ]
+    return run_stage('fused', 'raw_to_servable', raw_dir, os.path.join('data', 'servable'),
+                     steps, dry_run, force, workers, executor, history=True, only=only,
+                     publish=True, step_stages=['curate', 'transform', 'serve'] if materialize else None)
 
-def run_full_pipeline(dry_run=False):
-    """Run the complete pipeline"""
+def run_full_pipeline(dry_run=False, force=False, workers=1, executor='thread', only=None):
+    """Run the complete pipeline, optionally for only some raw-zone paths"""
     print(f"=== RUNNING {'DRY-RUN' if dry_run else 'FULL'} PIPELINE ===")
     print(f"Timestamp: {datetime.utcnow().isoformat()} UTC")
     
-    curated_files = curate_data(dry_run)
-    transformed_files = transform_data(dry_run)
-    servable_files = serve_data_stage(dry_run)
+    curated_files = curate_data(dry_run, force, workers, executor, only)
+    transformed_files = transform_data(dry_run, force, workers, executor, only)
+    servable_files = serve_data_stage(dry_run, force, workers, executor, only)
     
     print(f"=== PIPELINE {'DRY-RUN' if dry_run else ''} COMPLETE ===")
     print(f"Curated: {len(curated_files)} files")
@@ -228,17 +610,55 @@ def main():
                         default='full', help='Pipeline stage to run')
     parser.add_argument('--dry-run', action='store_true', 
                         help='Show what would be done without making changes')
+    parser.add_argument('--force', action='store_true',
+                        help='Reprocess every file, ignoring the incremental manifests')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of files to process in parallel')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help='Worker pool type used when --workers > 1')
+    parser.add_argument('--fused', action='store_true',
+                        help='Run raw -> servable in one pass without intermediate zones')
+    parser.add_argument('--materialize', action='store_true',
+                        help='With --fused, also write the curated and transformed zones')
+    parser.add_argument('--rollback', nargs='?', const='', metavar='VERSION',
+                        help='Re-publish an older servable version (default: the one before current)')
+    parser.add_argument('--list-versions', action='store_true',
+                        help='List servable versions and exit')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and process raw-zone changes as they happen')
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help='With --watch, seconds of quiet to wait before processing a burst')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='With --watch, scan interval when inotify is unavailable')
+    parser.add_argument('--notify-url',
+                        help='With --watch, URL to POST to after each run (e.g. http://localhost:5000/api/refresh)')
     
     args = parser.parse_args()
     
-    if args.stage == 'curate':
-        curate_data(args.dry_run)
+    options = (args.dry_run, args.force, args.workers, args.executor)
+    
+    if args.list_versions:
+        servable_dir = os.path.join('data', 'servable')
+        current = zone_versions.current_version(servable_dir)
+        for version in zone_versions.list_versions(servable_dir):
+            print(f"{'*' if version == current else ' '} {version}")
+    elif args.rollback is not None:
+        rollback_servable(args.rollback or None)
+    elif args.watch:
+        import watcher
+        watcher.watch_raw_zone(options, fused=args.fused, materialize=args.materialize,
+                               debounce=args.debounce, poll_interval=args.poll_interval,
+                               notify_url=args.notify_url)
+    elif args.stage == 'curate':
+        curate_data(*options)
     elif args.stage == 'transform':
-        transform_data(args.dry_run)
+        transform_data(*options)
     elif args.stage == 'serve':
-        serve_data_stage(args.dry_run)
+        serve_data_stage(*options)
+    elif args.fused:
+        run_fused_pipeline(*options, materialize=args.materialize)
     else:
-        run_full_pipeline(args.dry_run)
+        run_full_pipeline(*options)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
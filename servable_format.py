@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Servable Binary Formats
+
+Compact single-file copies of a servable zone version, written next to
+the JSON documents at publish time so pipeline.serve_data can load the
+whole zone without walking and parsing every document.
+
+Every format stores the same table: the contributing documents (paths
+relative to the version), one row per metric, each row's document index
+and its timestamp already parsed to epoch seconds, so the snapshot index
+is built without re-parsing ISO 8601 strings.
+
+columnar (stdlib only):
+    b'PDSV' | uint32 header length | JSON header | column blobs
+
+    The header lists the documents and, per metric key, a column type,
+    an optional presence bitmap (omitted when every row has the key) and
+    the blob holding the present values in row order:
+
+        q  int64 array        d  float64 array
+        s  NUL-joined UTF-8   j  JSON array (mixed or nested values)
+
+    Rows are rebuilt with a few C-level decode calls per column rather
+    than a parser pass over every character of indented JSON.
+
+msgpack:
+    One msgpack map {documents, doc_index, timestamps, metrics}. Only
+    available when the optional msgpack package is installed.
+"""
+
+import os
+import sys
+import json
+import struct
+from array import array
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; columnar needs only the stdlib
+    msgpack = None
+
+FORMATS = ('columnar', 'msgpack', 'none')
+ARTIFACT_NAMES = {'columnar': 'servable.columnar', 'msgpack': 'servable.msgpack'}
+MAGIC = b'PDSV'
+FORMAT_VERSION = 1
+HEADER_LENGTH = struct.Struct('<I')
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+NAN = float('nan')
+
+class ArtifactError(ValueError):
+    """Artifact is corrupt, of an unknown version, or needs a missing package."""
+
+def available_formats():
+    """Formats that can be written and read in this environment"""
+    return [fmt for fmt in FORMATS if fmt != 'msgpack' or msgpack is not None]
+
+def find_artifact(zone_root):
+    """Return (format, path) of the artifact in a zone directory, or (None, None)"""
+    for fmt, name in ARTIFACT_NAMES.items():
+        path = os.path.join(zone_root, name)
+        if os.path.exists(path):
+            return fmt, path
+    return None, None
+
+def _little_endian(column):
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+def _column_type(values):
+    if all(type(value) is int and INT64_MIN <= value <= INT64_MAX for value in values):
+        return 'q'
+    if all(type(value) is float for value in values):
+        return 'd'
+    if all(type(value) is str and '\0' not in value for value in values):
+        return 's'
+    return 'j'
+
+def _encode_values(kind, values):
+    if kind in ('q', 'd'):
+        return _little_endian(array(kind, values)).tobytes()
+    if kind == 's':
+        return '\0'.join(values).encode('utf-8')
+    return json.dumps(values, separators=(',', ':')).encode('utf-8')
+
+def _decode_values(kind, blob, count):
+    if kind in ('q', 'd'):
+        column = array(kind)
+        column.frombytes(blob)
+        return _little_endian(column).tolist()
+    if kind == 's':
+        return blob.decode('utf-8').split('\0') if count else []
+    return json.loads(blob)
+
+def encode_columnar(documents, metrics, doc_index, timestamps):
+    rows = len(metrics)
+    keys = list(dict.fromkeys(key for metric in metrics for key in metric))
+    blobs = []
+    offset = 0
+
+    def add_blob(blob):
+        nonlocal offset
+        blobs.append(blob)
+        span = [offset, len(blob)]
+        offset += len(blob)
+        return span
+
+    columns = []
+    for key in keys:
+        values = []
+        mask = bytearray((rows + 7) // 8)
+        for row, metric in enumerate(metrics):
+            if key in metric:
+                values.append(metric[key])
+                mask[row >> 3] |= 1 << (row & 7)
+        kind = _column_type(values)
+        columns.append({
+            'key': key,
+            'type': kind,
+            'count': len(values),
+            'mask': add_blob(bytes(mask)) if len(values) < rows else None,
+            'data': add_blob(_encode_values(kind, values)),
+        })
+
+    header = {
+        'version': FORMAT_VERSION,
+        'rows': rows,
+        'documents': documents,
+        'doc_index': add_blob(_little_endian(array('q', doc_index)).tobytes()),
+        # NaN marks a metric without a timestamp
+        'timestamps': add_blob(_little_endian(array(
+            'd', (NAN if timestamp is None else timestamp for timestamp in timestamps))).tobytes()),
+        'columns': columns,
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return MAGIC + HEADER_LENGTH.pack(len(header_bytes)) + header_bytes + b''.join(blobs)
+
+def decode_columnar(raw):
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ArtifactError("Not a columnar servable artifact")
+    start = len(MAGIC) + HEADER_LENGTH.size
+    (header_length,) = HEADER_LENGTH.unpack_from(raw, len(MAGIC))
+    header = json.loads(raw[start:start + header_length])
+    if header.get('version') != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported columnar version: {header.get('version')}")
+    body = memoryview(raw)[start + header_length:]
+
+    def blob(span):
+        return bytes(body[span[0]:span[0] + span[1]])
+
+    rows = header['rows']
+    missing = object()
+    keys = []
+    columns = []
+    sparse = False
+    for column in header['columns']:
+        values = _decode_values(column['type'], blob(column['data']), column['count'])
+        if column['mask'] is not None:
+            # Spread present values over their rows, marking the gaps
+            mask = blob(column['mask'])
+            present = iter(values)
+            values = [next(present) if mask[row >> 3] >> (row & 7) & 1 else missing
+                      for row in range(rows)]
+            sparse = True
+        keys.append(column['key'])
+        columns.append(values)
+
+    if not columns:
+        metrics = [{} for _ in range(rows)]
+    elif sparse:
+        metrics = [{key: value for key, value in zip(keys, row) if value is not missing}
+                   for row in zip(*columns)]
+    else:
+        metrics = [dict(zip(keys, row)) for row in zip(*columns)]
+
+    doc_index = _decode_values('q', blob(header['doc_index']), rows)
+    timestamps = [None if timestamp != timestamp else timestamp
+                  for timestamp in _decode_values('d', blob(header['timestamps']), rows)]
+    return header['documents'], metrics, doc_index, timestamps
+
+def encode(fmt, documents, metrics, doc_index, timestamps):
+    """Serialize the servable table in the given format"""
+    if fmt == 'columnar':
+        return encode_columnar(documents, metrics, doc_index, timestamps)
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ArtifactError("msgpack format requires the msgpack package")
+        return msgpack.packb({'documents': documents, 'doc_index': doc_index,
+                              'timestamps': timestamps, 'metrics': metrics}, use_bin_type=True)
+    raise ArtifactError(f"Unknown servable format: {fmt}")
+
+def decode(fmt, raw):
+    """Return (documents, metrics, doc_index, timestamps) from serialized bytes"""
+    if fmt == 'columnar':
+        return decode_columnar(raw)
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ArtifactError("msgpack format requires the msgpack package")
+        table = msgpack.unpackb(raw, raw=False)
+        return table['documents'], table['metrics'], table['doc_index'], table['timestamps']
+    raise ArtifactError(f"Unknown servable format: {fmt}")
+
+def read_artifact(fmt, path):
+    with open(path, 'rb') as f:
+        return decode(fmt, f.read())
@@ -0,0 +1,74 @@
+"""/api/data query parameters: paging, cursors and timestamp filters."""
+
+import base64
+import json
+import os
+
+import pytest
+
+import app as backend
+import pipeline
+
+METRICS = [{'name': f'm{i}', 'value': i, 'timestamp': 60 * i} for i in range(5)]
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(pipeline.SERVABLE_DIR)
+    with open(os.path.join(pipeline.SERVABLE_DIR, 'a.json'), 'w') as f:
+        json.dump({'metrics': METRICS}, f)
+    pipeline.invalidate_servable_snapshot()
+    return backend.app.test_client()
+
+def raw_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode('utf-8')).decode('ascii')
+
+def test_limit_and_cursor_page_through_all_metrics(client):
+    names = []
+    response = client.get('/api/data?limit=2')
+    while True:
+        body = response.get_json()
+        assert response.status_code == 200 and body['total'] == 5
+        names.extend(metric['name'] for metric in body['metrics'])
+        if body['next_cursor'] is None:
+            break
+        response = client.get(f"/api/data?limit=2&cursor={body['next_cursor']}")
+    assert names == [metric['name'] for metric in METRICS]
+
+def test_cursor_from_older_snapshot_is_rejected(client):
+    cursor = client.get('/api/data?limit=2').get_json()['next_cursor']
+    pipeline.invalidate_servable_snapshot()
+    response = client.get(f'/api/data?limit=2&cursor={cursor}')
+    assert response.status_code == 400
+    assert 'older snapshot' in response.get_json()['error']
+
+@pytest.mark.parametrize('cursor', [
+    raw_cursor({'generation': 1e400, 'offset': 0}),
+    raw_cursor({'generation': 1, 'offset': 1e400}),
+    raw_cursor({'generation': 1, 'offset': -1}),
+    'not-a-cursor',
+])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get(f'/api/data?cursor={cursor}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+@pytest.mark.parametrize('since', ['nan', 'inf', '-inf', '1e400', 'yesterday'])
+def test_invalid_since_is_rejected(client, since):
+    assert client.get(f'/api/data?since={since}').status_code == 400
+
+def test_since_filters_by_timestamp(client):
+    body = client.get('/api/data?since=120').get_json()
+    assert [metric['name'] for metric in body['metrics']] == ['m2', 'm3', 'm4']
+
+def test_metric_lookup_accepts_names_with_slashes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(pipeline.SERVABLE_DIR)
+    with open(os.path.join(pipeline.SERVABLE_DIR, 'a.json'), 'w') as f:
+        json.dump({'metrics': [{'name': 'labs/openai/headcount', 'value': 1}]}, f)
+    pipeline.invalidate_servable_snapshot()
+    client = backend.app.test_client()
+
+    body = client.get('/api/metrics/labs/openai/headcount').get_json()
+    assert body['metric']['value'] == 1
+    assert client.get('/api/metrics/labs/openai').status_code == 404
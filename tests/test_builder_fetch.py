@@ -0,0 +1,117 @@
+"""Builder fetches against a local HTTP server: concurrency, deadline and retries."""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import yaml
+
+from build_system import PDoomDashboardBuilder
+
+REPO_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'config', 'dashboard_config.yaml')
+
+class SourceHandler(BaseHTTPRequestHandler):
+    """Data sources keyed by path; every request is recorded on the server"""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        hits = sum(1 for path, _ in self.server.requests if path == self.path)
+        if self.path.startswith('/slow/'):
+            time.sleep(0.5)
+        elif self.path == '/hang':
+            time.sleep(5)
+        elif self.path == '/flaky' and hits == 1:
+            return self.reply(503, b'')
+        elif self.path == '/etag':
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self.reply(304, b'', etag='"v1"')
+            return self.reply(200, b'{"current_value": %d}' % hits, etag='"v1"')
+        self.reply(200, b'{"current_value": %d}' % hits)
+
+    def reply(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class SourceServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 would stall simultaneous connects
+    request_queue_size = 64
+
+@pytest.fixture
+def server():
+    httpd = SourceServer(('127.0.0.1', 0), SourceHandler)
+    httpd.requests = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def make_builder(tmp_path, **build):
+    with open(REPO_CONFIG) as f:
+        config = yaml.safe_load(f)
+    config['build'] = {'fetch_workers': 20, 'pool_size': 20, 'per_host_limit': 20,
+                       'backoff_factor': 0, 'backoff_jitter': 0, **build}
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    with open(config_dir / 'dashboard_config.yaml', 'w') as f:
+        yaml.safe_dump(config, f)
+    return PDoomDashboardBuilder(config_dir=str(config_dir), data_dir=str(tmp_path / 'data'),
+                                 templates_dir=str(tmp_path / 'templates'), output_dir=str(tmp_path))
+
+def url_metrics(server, paths):
+    base = f"http://127.0.0.1:{server.server_port}"
+    return [{'id': path.strip('/').replace('/', '_'), 'data_source': f"url:{base}{path}", 'placeholder': False}
+            for path in paths]
+
+def fetch(builder, metrics):
+    settings = builder.load_settings().build
+    start = time.monotonic()
+    results = builder.fetch_all_metrics(metrics, settings)
+    return results, time.monotonic() - start
+
+def test_fetches_run_concurrently(tmp_path, server):
+    builder = make_builder(tmp_path)
+    metrics = url_metrics(server, [f'/slow/{i}' for i in range(20)])
+    results, elapsed = fetch(builder, metrics)
+    assert all(results[metric['id']] == {'current_value': 1} for metric in metrics)
+    # Twenty 0.5 s fetches one after another would take 10 s
+    assert elapsed < 1.5
+
+def test_hung_source_is_cut_off_at_deadline(tmp_path, server):
+    builder = make_builder(tmp_path, fetch_deadline=0.5, max_retries=0)
+    results, elapsed = fetch(builder, url_metrics(server, ['/hang', '/fast']))
+    assert results == {'hang': None, 'fast': {'current_value': 1}}
+    assert elapsed < 2.0
+
+def test_unavailable_source_is_retried(tmp_path, server):
+    builder = make_builder(tmp_path, max_retries=2)
+    results, _ = fetch(builder, url_metrics(server, ['/flaky']))
+    assert results == {'flaky': {'current_value': 2}}
+    assert [path for path, _ in server.requests] == ['/flaky', '/flaky']
+
+def test_unchanged_source_is_revalidated_and_not_reparsed(tmp_path, server):
+    builder = make_builder(tmp_path)
+    url = url_metrics(server, ['/etag'])[0]['data_source'][len('url:'):]
+    first = builder.fetch_from_url(url)
+    second = builder.fetch_from_url(url)
+
+    (_, first_headers), (_, second_headers) = server.requests
+    assert 'If-None-Match' not in first_headers
+    assert second_headers['If-None-Match'] == '"v1"'
+    # The 304 reuses the cached body, and the payload parsed from it
+    assert second is first and first == {'current_value': 1}
+
+    # A restarted builder revalidates from the on-disk cache alone
+    restarted = PDoomDashboardBuilder(config_dir=str(tmp_path / 'config'), data_dir=str(tmp_path / 'data'),
+                                      templates_dir=str(tmp_path / 'templates'), output_dir=str(tmp_path))
+    assert restarted.fetch_from_url(url) == {'current_value': 1}
+    assert server.requests[-1][1]['If-None-Match'] == '"v1"'
@@ -0,0 +1,48 @@
+"""History segments: one file per run, reads across segments and compaction."""
+
+import os
+import shutil
+
+import history_store
+
+def series(name, history_dir):
+    times, values = history_store.load_series(name, history_dir)
+    return list(times), list(values)
+
+def test_each_run_writes_one_segment(tmp_path):
+    history = str(tmp_path)
+    assert history_store.append_samples([('a', 3, 30), ('a', 1, 10), ('b', 2, 20)], history) == 2
+    assert history_store.append_samples([('a', 2, 20), ('c', 5, 50)], history) == 2
+    assert len(os.listdir(history)) == 2
+
+    assert history_store.list_series(history) == ['a', 'b', 'c']
+    assert series('a', history) == ([1, 2, 3], [10, 20, 30])
+    assert series('missing', history) == ([], [])
+    assert history_store.trend('a', 1, history) == 10
+
+def test_compaction_merges_segments(tmp_path):
+    history = str(tmp_path)
+    for timestamp in range(5):
+        history_store.append_samples([('a', timestamp, timestamp * 10), (f'n{timestamp}', 0, 1)], history)
+    assert history_store.compact(history) == 5
+    assert len(os.listdir(history)) == 1
+    assert series('a', history) == ([0, 1, 2, 3, 4], [0, 10, 20, 30, 40])
+    assert history_store.list_series(history) == ['a', 'n0', 'n1', 'n2', 'n3', 'n4']
+
+def test_interrupted_compaction_does_not_duplicate_points(tmp_path):
+    history = str(tmp_path / 'history')
+    for timestamp in range(3):
+        history_store.append_samples([('a', timestamp, timestamp)], history)
+    backup = str(tmp_path / 'backup')
+    shutil.copytree(history, backup)
+    history_store.compact(history)
+
+    # As if compaction stopped before deleting the segments it merged
+    for file in os.listdir(backup):
+        shutil.copy2(os.path.join(backup, file), history)
+    assert len(os.listdir(history)) == 4
+    assert series('a', history) == ([0, 1, 2], [0, 1, 2])
+
+    assert history_store.compact(history) == 0
+    assert len(os.listdir(history)) == 1
+    assert series('a', history) == ([0, 1, 2], [0, 1, 2])
@@ -0,0 +1,41 @@
+"""Staged and fused pipeline runs sharing the stage manifests."""
+
+import json
+import os
+
+import run_pipeline
+
+def write_doc(path, document):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f)
+
+def run_staged():
+    return (run_pipeline.curate_data(), run_pipeline.transform_data(), run_pipeline.serve_data_stage())
+
+def test_staged_run_after_materialized_fused_run_skips_everything(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw = os.path.join('data', 'raw')
+    write_doc(os.path.join(raw, 'a.json'), {'metrics': [{'name': 'a', 'value': 1}]})
+    write_doc(os.path.join(raw, 'sub', 'b.json'), {'metrics': [{'name': 'b', 'value': 2}]})
+    assert run_pipeline.run_fused_pipeline(materialize=True) == ['a.json', 'sub/b.json']
+
+    assert run_staged() == ([], [], [])
+
+def test_deleted_invalid_input_still_removes_its_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw_file = os.path.join('data', 'raw', 'a.json')
+    curated_file = os.path.join('data', 'curated', 'a.json')
+    write_doc(raw_file, {'metrics': [{'name': 'a', 'value': 1}]})
+    assert run_pipeline.curate_data() == ['a.json']
+    assert os.path.exists(curated_file)
+
+    # The failed run keeps the last good entry, so the output stays tracked
+    write_doc(raw_file, {'no_metrics': True})
+    assert run_pipeline.curate_data() == []
+    assert os.path.exists(curated_file)
+
+    os.remove(raw_file)
+    run_pipeline.curate_data()
+    assert not os.path.exists(curated_file)
+    assert run_pipeline.load_stage_manifest('curate')['files'] == {}
@@ -0,0 +1,164 @@
+"""Binary servable format round-trips and servable version publish/rollback."""
+
+import json
+import os
+
+import pytest
+
+import run_pipeline
+import servable_format
+import zone_versions
+
+METRICS = [
+    {'name': 'ints', 'value': 847, 'big': 2 ** 70, 'label': 'plain'},
+    {'name': 'floats', 'value': 1.5, 'label': 'nul\0inside', 'flag': True},
+    {'name': 'mixed', 'value': 2, 'nested': {'a': [1, None]}, 'label': ''},
+    {'name': 'sparse', 'value': None, 'flag': False, 'label': 'ünïcode'},
+    {},
+]
+DOCUMENTS = ['a.json', 'sub/b.json']
+DOC_INDEX = [0, 0, 1, 1, 1]
+TIMESTAMPS = [1700000000.0, None, 1700000001.5, None, 0.0]
+
+def canonical(metrics):
+    """JSON text, so 1 vs 1.0 and True vs 1 count as different"""
+    return json.dumps(metrics, sort_keys=True)
+
+def test_columnar_round_trip():
+    raw = servable_format.encode('columnar', DOCUMENTS, METRICS, DOC_INDEX, TIMESTAMPS)
+    documents, metrics, doc_index, timestamps = servable_format.decode('columnar', raw)
+    assert documents == DOCUMENTS
+    assert canonical(metrics) == canonical(METRICS)
+    assert doc_index == DOC_INDEX
+    assert timestamps == TIMESTAMPS
+
+@pytest.mark.parametrize('values, kind', [
+    ([1, -2, 2 ** 63 - 1], 'q'),
+    ([1.0, -0.5], 'd'),
+    (['a', ''], 's'),
+    (['a\0b'], 'j'),
+    ([True, False], 'j'),
+    ([1, 1.5], 'j'),
+    ([2 ** 63], 'j'),
+])
+def test_column_types(values, kind):
+    assert servable_format._column_type(values) == kind
+    metrics = [{'v': value} for value in values]
+    raw = servable_format.encode('columnar', ['a.json'], metrics, [0] * len(metrics), [None] * len(metrics))
+    assert canonical(servable_format.decode('columnar', raw)[1]) == canonical(metrics)
+
+def test_columnar_empty_table():
+    raw = servable_format.encode('columnar', [], [], [], [])
+    assert servable_format.decode('columnar', raw) == ([], [], [], [])
+
+def test_columnar_rejects_foreign_bytes():
+    with pytest.raises(servable_format.ArtifactError):
+        servable_format.decode('columnar', b'{"metrics": []}')
+
+def test_msgpack_round_trip():
+    pytest.importorskip('msgpack')
+    raw = servable_format.encode('msgpack', DOCUMENTS, METRICS, DOC_INDEX, TIMESTAMPS)
+    documents, metrics, doc_index, timestamps = servable_format.decode('msgpack', raw)
+    assert (documents, doc_index, timestamps) == (DOCUMENTS, DOC_INDEX, TIMESTAMPS)
+    assert canonical(metrics) == canonical(METRICS)
+
+def write_doc(path, metrics):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'metrics': metrics}, f)
+
+def read_artifact(version_dir):
+    fmt, path = servable_format.find_artifact(version_dir)
+    return servable_format.read_artifact(fmt, path)
+
+def test_artifact_reuses_rows_of_unchanged_documents(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # no config/data_zones.yaml: default format
+    version = str(tmp_path / 'version')
+    write_doc(os.path.join(version, 'a.json'), [{'name': 'a', 'value': 1}])
+    write_doc(os.path.join(version, 'b.json'), [{'name': 'b', 'value': 2}])
+    write_doc(os.path.join(version, 'c.json'), [{'name': 'c', 'value': 3}])
+    run_pipeline.write_servable_artifact(version, set())
+
+    # a.json is not reported as changed, so its old rows must be kept
+    write_doc(os.path.join(version, 'a.json'), [{'name': 'a', 'value': 100}])
+    write_doc(os.path.join(version, 'b.json'), [{'name': 'b', 'value': 200, 'timestamp': 60}])
+    os.remove(os.path.join(version, 'c.json'))
+    write_doc(os.path.join(version, 'sub', 'd.json'), [])
+    run_pipeline.write_servable_artifact(version, {'b.json', 'c.json', 'sub/d.json'})
+
+    documents, metrics, doc_index, timestamps = read_artifact(version)
+    assert documents == ['a.json', 'b.json', 'sub/d.json']
+    assert metrics == [{'name': 'a', 'value': 1}, {'name': 'b', 'value': 200, 'timestamp': 60}]
+    assert doc_index == [0, 1]
+    assert timestamps == [None, 60.0]
+
+def test_artifact_disabled_removes_seeded_copy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    version = str(tmp_path / 'version')
+    write_doc(os.path.join(version, 'a.json'), [{'name': 'a', 'value': 1}])
+    run_pipeline.write_servable_artifact(version, set())
+    assert servable_format.find_artifact(version)[0] == 'columnar'
+
+    os.makedirs('config')
+    with open(run_pipeline.ZONE_CONFIG_PATH, 'w') as f:
+        f.write('servable:\n  binary_format: none\n')
+    assert run_pipeline.write_servable_artifact(version, set()) is None
+    assert servable_format.find_artifact(version) == (None, None)
+
+def test_versions_create_publish_rollback_prune(tmp_path):
+    zone = str(tmp_path / 'zone')
+    first = zone_versions.create_version(zone)
+    write_doc(os.path.join(first, 'a.json'), [{'name': 'a', 'value': 1}])
+    zone_versions.publish(zone, first)
+    assert zone_versions.current_version(zone) == os.path.basename(first)
+
+    # A new version is seeded with hardlinks to the published files
+    second = zone_versions.create_version(zone)
+    assert os.path.samefile(os.path.join(first, 'a.json'), os.path.join(second, 'a.json'))
+    run_pipeline.write_json(os.path.join(second, 'a.json'), {'metrics': [{'name': 'a', 'value': 2}]})
+    with open(os.path.join(first, 'a.json')) as f:
+        assert json.load(f)['metrics'][0]['value'] == 1  # replaced, not modified in place
+    zone_versions.publish(zone, second)
+
+    assert zone_versions.rollback(zone) == os.path.basename(first)
+    assert zone_versions.current_version(zone) == os.path.basename(first)
+    with pytest.raises(ValueError):
+        zone_versions.rollback(zone)  # nothing older than the first version
+    with pytest.raises(ValueError):
+        zone_versions.rollback(zone, 'no-such-version')
+
+    # Pruning keeps the published version even when it is the oldest
+    assert zone_versions.prune(zone, 1) == []
+    assert zone_versions.list_versions(zone) == sorted(os.path.basename(v) for v in (first, second))
+
+def run_serve_stage():
+    return run_pipeline.run_stage('serve', 'transformed_to_servable', os.path.join('data', 'transformed'),
+                                  os.path.join('data', 'servable'), [(run_pipeline.serve_document, None)],
+                                  publish=True)
+
+def test_rollback_restores_serve_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    transformed = os.path.join('data', 'transformed')
+    write_doc(os.path.join(transformed, 'a.json'), [{'name': 'a', 'value': 1}])
+    run_serve_stage()
+    first_entries = run_pipeline.load_stage_manifest('serve')['files']
+
+    write_doc(os.path.join(transformed, 'a.json'), [{'name': 'a', 'value': 2}])
+    write_doc(os.path.join(transformed, 'b.json'), [{'name': 'b', 'value': 3}])
+    assert run_serve_stage() == ['a.json', 'b.json']
+    run_pipeline.save_stage_manifest('fused', {'stale.json': {}})
+
+    servable = os.path.join('data', 'servable')
+    current = os.path.realpath(zone_versions.current_path(servable))
+    documents, metrics, _, _ = read_artifact(current)
+    assert documents == ['a.json', 'b.json'] and metrics[0]['value'] == 2
+
+    version = run_pipeline.rollback_servable()
+    assert version == zone_versions.list_versions(servable)[0]
+    assert run_pipeline.load_stage_manifest('serve')['files'] == first_entries
+    # The rolled-back version has no fused manifest, so the stale one is dropped
+    assert not os.path.exists(run_pipeline.stage_manifest_path('fused'))
+
+    # Only b.json differs from what the restored version was built from
+    write_doc(os.path.join(transformed, 'a.json'), [{'name': 'a', 'value': 1}])
+    assert run_serve_stage() == ['b.json']
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Raw Zone Watcher
+
+Daemon behind `run_pipeline.py --watch`. Waits for changes under
+data/raw, debounces bursts of events, then runs only the changed files
+through the pipeline and optionally tells the Flask backend to refresh
+its servable snapshot.
+
+On Linux, changes come from inotify (through ctypes, no extra package).
+Elsewhere, or if inotify cannot be set up, the raw zone is rescanned
+every poll interval and files are compared by mtime and size.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import urllib.request
+
+import run_pipeline
+
+RAW_DIR = os.path.join('data', 'raw')
+# Returned in a change set when individual paths are unknown (e.g. inotify queue overflow)
+RESCAN = '*'
+# A continuous burst is processed after at most this many debounce periods
+MAX_DEBOUNCE_PERIODS = 10
+# Header carrying the shared secret accepted by /api/refresh
+REFRESH_TOKEN_HEADER = 'X-Refresh-Token'
+REFRESH_TOKEN_ENV = 'PDOOM_REFRESH_TOKEN'
+
+# inotify(7) constants
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """Recursive inotify watch on a directory tree"""
+
+    def __init__(self, root):
+        self.root = root
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        self._add_tree(root)
+
+    def close(self):
+        os.close(self._fd)
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOENT:
+                return False
+            raise OSError(error, f'inotify_add_watch failed for {path}')
+        self._dirs[wd] = path
+        return True
+
+    def _add_tree(self, top):
+        """Watch top and every directory below it; return the JSON files already there"""
+        existing = set()
+        for root, dirs, files in os.walk(top):
+            if not self._add_watch(root):
+                continue
+            for file in files:
+                if file.endswith('.json'):
+                    existing.add(os.path.relpath(os.path.join(root, file), self.root))
+        return existing
+
+    def read(self, timeout=None):
+        """Wait up to `timeout` seconds (forever if None) and return changed paths"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return set()
+            changed = self._read_events()
+            # Events such as IN_CREATE on a file do not count as a change yet
+            if changed:
+                return changed
+
+    def _read_events(self):
+        buffer = os.read(self._fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changed.add(RESCAN)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._dirs[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if directory == self.root:
+                    raise RuntimeError(f"Watched directory {self.root} was removed")
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may have landed before the new watch was in place
+                    changed |= self._add_tree(path)
+                elif mask & IN_MOVED_FROM:
+                    # Its files left with it; let the full run clean up their outputs
+                    changed.add(RESCAN)
+            elif name.endswith('.json') and mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE):
+                changed.add(os.path.relpath(path, self.root))
+        return changed
+
+class PollingWatcher:
+    """Fallback that rescans the tree and compares (mtime_ns, size) per file"""
+
+    def __init__(self, root, interval=1.0):
+        self.root = root
+        self.interval = interval
+        self._signatures = self._scan()
+
+    def close(self):
+        pass
+
+    def _scan(self):
+        signatures = {}
+        for src_file, rel_path in run_pipeline.iter_json_files(self.root):
+            try:
+                st = os.stat(src_file)
+            except OSError:
+                continue
+            signatures[rel_path] = (st.st_mtime_ns, st.st_size)
+        return signatures
+
+    def read(self, timeout=None):
+        """Wait up to `timeout` seconds (forever if None) and return changed paths"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if wait > 0:
+                time.sleep(wait)
+            current = self._scan()
+            changed = {rel_path for rel_path in set(current) | set(self._signatures)
+                       if current.get(rel_path) != self._signatures.get(rel_path)}
+            self._signatures = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+def open_watcher(root, poll_interval=1.0):
+    """inotify on Linux, polling everywhere else"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(root, poll_interval)
+
+def collect_batch(source, debounce):
+    """Block for the first change, then gather more until `debounce` seconds pass quietly"""
+    pending = set()
+    while not pending:
+        pending = source.read()
+    deadline = time.monotonic() + debounce * MAX_DEBOUNCE_PERIODS
+    while True:
+        quiet = min(debounce, deadline - time.monotonic())
+        if quiet <= 0:
+            break
+        more = source.read(quiet)
+        if not more:
+            break
+        pending |= more
+    return pending
+
+def notify(url):
+    """POST to the backend's refresh endpoint; failures are reported, not raised"""
+    request = urllib.request.Request(url, data=b'', method='POST')
+    token = os.environ.get(REFRESH_TOKEN_ENV)
+    if token:
+        request.add_header(REFRESH_TOKEN_HEADER, token)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            print(f"Notified {url}: HTTP {response.status}")
+    except OSError as e:
+        print(f"Warning: Could not notify {url}: {e}")
+
+def run_batch(options, only, fused=False, materialize=False):
+    """Run the pipeline for the given raw-zone paths (all files if only is None)"""
+    if fused:
+        return run_pipeline.run_fused_pipeline(*options, materialize=materialize, only=only)
+    return run_pipeline.run_full_pipeline(*options, only=only)
+
+def watch_raw_zone(options, fused=False, materialize=False, debounce=2.0, poll_interval=1.0,
+                   notify_url=None, raw_dir=RAW_DIR):
+    """Process raw-zone changes until interrupted"""
+    os.makedirs(raw_dir, exist_ok=True)
+    source = open_watcher(raw_dir, poll_interval)
+    print(f"=== WATCHING {raw_dir} ({type(source).__name__}) ===")
+
+    # Catch up on anything that changed while nobody was watching
+    run_batch(options, None, fused, materialize)
+    if notify_url:
+        notify(notify_url)
+
+    try:
+        while True:
+            changed = collect_batch(source, debounce)
+            only = None if RESCAN in changed else sorted(changed)
+            print(f"Detected changes: {'full rescan' if only is None else ', '.join(only)}")
+            try:
+                run_batch(options, only, fused, materialize)
+            except Exception as e:
+                # Keep the daemon alive; the catch-up run on restart retries these files
+                print(f"✗ Pipeline run failed: {e}")
+                continue
+            if notify_url:
+                notify(notify_url)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        source.close()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Zone Versions
+
+Versioned publication of a zone directory. Each run is built into
+<zone>/versions/<version_id>, seeded with hardlinks to the files of the
+current version, and published by atomically replacing the
+<zone>/current symlink. Readers resolve `current` once and see a single
+complete version; older versions stay on disk for instant rollback.
+"""
+
+import os
+import uuid
+import shutil
+from datetime import datetime
+
+VERSIONS_DIR = 'versions'
+CURRENT_LINK = 'current'
+
+def current_path(zone_dir):
+    return os.path.join(zone_dir, CURRENT_LINK)
+
+def versions_path(zone_dir):
+    return os.path.join(zone_dir, VERSIONS_DIR)
+
+def current_version(zone_dir):
+    """Id of the published version, or None if the zone is not versioned yet"""
+    try:
+        return os.path.basename(os.readlink(current_path(zone_dir)))
+    except OSError:
+        return None
+
+def list_versions(zone_dir):
+    """Version ids, oldest first (ids sort chronologically)"""
+    root = versions_path(zone_dir)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+
+def link_tree(src_dir, dst_dir):
+    """Recreate src_dir under dst_dir with hardlinks, copying where links are not supported
+
+    Writers must replace files (see run_pipeline.write_atomic), never
+    modify them in place, or the change would leak into older versions.
+    """
+    for root, dirs, files in os.walk(src_dir):
+        target_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for file in files:
+            if file.endswith('.tmp'):
+                continue
+            src_file = os.path.join(root, file)
+            dst_file = os.path.join(target_root, file)
+            try:
+                os.link(src_file, dst_file)
+            except OSError:
+                shutil.copy2(src_file, dst_file)
+
+def create_version(zone_dir):
+    """Create a new, unpublished version seeded from the current one; returns its path"""
+    root = versions_path(zone_dir)
+    os.makedirs(root, exist_ok=True)
+    while True:
+        version_dir = os.path.join(root, datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ'))
+        try:
+            os.mkdir(version_dir)
+            break
+        except FileExistsError:
+            continue
+
+    current = current_version(zone_dir)
+    if current is not None:
+        link_tree(os.path.join(root, current), version_dir)
+    return version_dir
+
+def publish(zone_dir, version_dir):
+    """Point `current` at version_dir in one atomic rename"""
+    target = os.path.relpath(version_dir, zone_dir)
+    tmp_link = os.path.join(zone_dir, f".{CURRENT_LINK}.{uuid.uuid4().hex[:8]}.tmp")
+    os.symlink(target, tmp_link)
+    try:
+        os.replace(tmp_link, current_path(zone_dir))
+    except BaseException:
+        os.remove(tmp_link)
+        raise
+
+def discard(version_dir):
+    """Delete an unpublished version"""
+    shutil.rmtree(version_dir, ignore_errors=True)
+
+def prune(zone_dir, keep):
+    """Delete all but the newest `keep` versions, never the published one; returns removed ids"""
+    current = current_version(zone_dir)
+    versions = list_versions(zone_dir)
+    removed = []
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version == current:
+            continue
+        discard(os.path.join(versions_path(zone_dir), version))
+        removed.append(version)
+    return removed
+
+def rollback(zone_dir, version=None):
+    """Publish an older version: the given id, or the one before the current version"""
+    versions = list_versions(zone_dir)
+    if version is None:
+        current = current_version(zone_dir)
+        older = [candidate for candidate in versions if current is None or candidate < current]
+        if not older:
+            raise ValueError("No older version to roll back to")
+        version = older[-1]
+    elif version not in versions:
+        raise ValueError(f"Unknown version: {version}")
+    publish(zone_dir, os.path.join(versions_path(zone_dir), version))
+    return version